@@ -0,0 +1,178 @@
+"""Create the SVerse category page fixtures used by the benchmarks.
+
+By default the pages are synthesized with the same layout as the live
+page (a `window.goodsDetailData = {...};` script with `facets`,
+`totalResults` and the product grid), so the benchmarks never need
+network access. Pass --record to capture the live page instead.
+
+    python benchmarks/make_fixtures.py
+    python benchmarks/make_fixtures.py --record typical
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+# name -> (men products, women products)
+SIZES = {
+    'small': (8, 4),
+    'typical': (72, 48),
+    'large': (1500, 900),
+}
+
+SIZE_VALUES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+BRANDS = ['SVerse', 'SHEIN', 'Glowmode', 'Dazy', 'Motf']
+CATEGORIES = ['T-Shirts', 'Shirts', 'Jeans', 'Dresses', 'Tops', 'Jackets', 'Trousers']
+COLOURS = ['Black', 'White', 'Navy', 'Olive', 'Beige', 'Pink', 'Grey']
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURES_DIR, f'{name}.html.gz')
+
+
+def load_fixture(name):
+    """Return the HTML of a fixture page as text"""
+    with gzip.open(fixture_path(name), 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def make_product(rng, index, gender):
+    code = f'{443000000 + index}_{rng.choice(COLOURS).lower()}'
+    price = rng.choice([399, 499, 599, 699, 799, 899, 999, 1199])
+    category = rng.choice(CATEGORIES)
+    return {
+        'code': code,
+        'name': f'{gender} {rng.choice(COLOURS)} {category} {index}',
+        'brandName': rng.choice(BRANDS),
+        'gender': gender,
+        'segmentNameText': category,
+        'price': {'currencyIso': 'INR', 'value': price, 'formattedValue': f'Rs.{price}'},
+        'wasPriceData': {'currencyIso': 'INR', 'value': price * 2, 'formattedValue': f'Rs.{price * 2}'},
+        'offerPrice': {'value': int(price * 0.9), 'displayformattedValue': f'Rs.{int(price * 0.9)}'},
+        'stock': {
+            'stockLevelStatus': 'inStock',
+            'stockLevel': rng.randint(1, 40),
+        },
+        'sizes': [{'value': v, 'inStock': rng.random() > 0.3} for v in SIZE_VALUES],
+        'images': [
+            {
+                'url': f'https://img.sheinindia.in/pub/media/{code}/{fmt}.jpg',
+                'format': fmt,
+                'imageType': 'PRIMARY' if i == 0 else 'GALLERY',
+                'altText': f'{gender} {category}',
+            }
+            for i, fmt in enumerate(['productGrid3ListingImage', 'productListingImage', 'superZoomPdp', 'mobileProductListingImage'])
+        ],
+        'url': f'/p/{code}',
+        'fnlColorVariantData': {
+            'colorGroup': code.split('_')[0],
+            'outfitPictureURL': f'https://img.sheinindia.in/pub/media/{code}/outfit.jpg',
+        },
+    }
+
+
+def make_facets(products):
+    def facet_values(prefix, keyfunc):
+        counts = {}
+        for product in products:
+            for value in keyfunc(product):
+                counts[value] = counts.get(value, 0) + 1
+        return {
+            f'{prefix}-{value}': {'name': value, 'count': count, 'selected': False}
+            for value, count in sorted(counts.items())
+        }
+
+    return {
+        'genderfilter': {
+            'name': 'Gender',
+            'values': facet_values('genderfilter', lambda p: [p['gender']]),
+        },
+        'verticalsizegroupformat': {
+            'name': 'Size',
+            'values': facet_values('verticalsizegroupformat', lambda p: [s['value'] for s in p['sizes'] if s['inStock']]),
+        },
+        'brand': {
+            'name': 'Brand',
+            'values': facet_values('brand', lambda p: [p['brandName']]),
+        },
+        'segmentNameText': {
+            'name': 'Category',
+            'values': facet_values('segmentNameText', lambda p: [p['segmentNameText']]),
+        },
+    }
+
+
+def make_page(name, seed=5939):
+    rng = random.Random(f'{seed}-{name}')
+    men, women = SIZES[name]
+    products = [make_product(rng, i, 'Men') for i in range(men)]
+    products += [make_product(rng, men + i, 'Women') for i in range(women)]
+    rng.shuffle(products)
+
+    data = {
+        'pagination': {'currentPage': 0, 'pageSize': len(products), 'totalPages': 1},
+        'sorts': [{'code': 'relevance', 'name': 'Relevance', 'selected': True}],
+        'facets': make_facets(products),
+        'totalResults': len(products),
+        'products': products,
+    }
+
+    tiles = '\n'.join(
+        f'<div class="item rilrtl-products-list__item"><a href="{p["url"]}">'
+        f'<img src="{p["images"][0]["url"]}" alt="{p["name"]}"/>'
+        f'<div class="brand">{p["brandName"]}</div><div class="name">{p["name"]}</div>'
+        f'<span class="price">{p["price"]["formattedValue"]}</span></a></div>'
+        for p in products
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8"/>
+<title>SVerse | SHEIN India</title>
+<link rel="stylesheet" href="/static/css/main.css"/>
+<script>window.__APP_CONFIG__ = {{"env":"prod","region":"IN"}}</script>
+<script src="/static/js/vendor.js"></script>
+</head>
+<body>
+<div id="appContainer"><div class="rilrtl-products-list">
+{tiles}
+</div></div>
+<script>window.goodsDetailData = {json.dumps(data, separators=(',', ':'))};</script>
+<script src="/static/js/main.js"></script>
+</body>
+</html>
+"""
+
+
+def record_page(url):
+    sys.path.insert(0, REPO_ROOT)
+    from bot_controller import CONFIG, SheinStockMonitor
+
+    config = dict(CONFIG, api_url=url or CONFIG['api_url'], database_path=':memory:')
+    return SheinStockMonitor(config).fetch_shein_page()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--record', metavar='NAME', help='capture the live page into fixtures/NAME.html.gz')
+    parser.add_argument('--url', help='page to record (defaults to CONFIG api_url)')
+    args = parser.parse_args()
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    pages = {args.record: record_page(args.url)} if args.record else {name: make_page(name) for name in SIZES}
+
+    for name, html in pages.items():
+        # mtime=0 keeps the gzip bytes stable so regenerating does not dirty git
+        with open(fixture_path(name), 'wb') as raw, gzip.GzipFile(filename='', fileobj=raw, mode='wb', mtime=0) as f:
+            f.write(html.encode('utf-8'))
+        print(f'{name}: {len(html) / 1024:.0f} KiB -> {fixture_path(name)}')
+
+
+if __name__ == '__main__':
+    main()
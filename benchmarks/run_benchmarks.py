@@ -0,0 +1,309 @@
+"""Offline performance benchmarks for bot_controller.
+
+Runs entirely against local fixtures and benchmarks/telegram_stub.py:
+
+  * parse     - parse_stock_page on the small/typical/large fixtures (full
+                parse, and separately with an unchanged product list)
+  * decode    - partial goodsDetailData decode vs a full json.loads
+                (time and peak allocation)
+  * tick      - a full check_stock tick (fetch from the stub, parse, DB write)
+  * broadcast - broadcast_message to N synthetic users
+
+Each run is saved under benchmarks/results/ and compared with the
+previous run (or --compare FILE) so revisions can be compared.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only parse,tick --quick
+    python benchmarks/run_benchmarks.py --users 10000 --latency 0.005 --rate-limit 0.01
+    python benchmarks/run_benchmarks.py --only broadcast --shards 4 --shard-rate 25 --latency 0.02
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, REPO_ROOT)
+
+import bot_controller  # noqa: E402
+from make_fixtures import SIZES, load_fixture  # noqa: E402
+
+
+def summarize(samples):
+    """Summary statistics (milliseconds) for a list of durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(bot_controller.percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(bot_controller.percentile(ordered, 95) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the bot's per-call output while timing"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def stub_server(latency, rate_limit):
+    """Run telegram_stub.py in its own process so it does not share our GIL"""
+    cmd = [sys.executable, os.path.join(BENCH_DIR, 'telegram_stub.py'),
+           '--latency', str(latency), '--rate-limit', str(rate_limit)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, cwd=BENCH_DIR)
+    try:
+        base_url = proc.stdout.readline().strip()
+        if not base_url:
+            raise RuntimeError('telegram_stub.py did not start')
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def make_monitor(base_url, db_path, shards=0, shard_rate=0):
+    config = dict(
+        bot_controller.CONFIG,
+        database_path=db_path,
+        telegram_api_base=base_url,
+        api_url=f'{base_url}/c/typical',
+        broadcast_delay_seconds=0,
+        sender_bot_tokens=[f'{900 + i}:bench-sender' for i in range(shards)],
+        shard_messages_per_second=shard_rate,
+    )
+    with quiet():
+        return bot_controller.SheinStockMonitor(config)
+
+
+def bench_parse(monitor, iterations):
+    """Full parse of each fixture (comparable across revisions), plus the
+    unchanged-product-list shortcut a steady page takes, reported apart"""
+    results = {}
+    for name in SIZES:
+        page = load_fixture(name)
+        runs = max(3, iterations if name != 'large' else iterations // 10)
+        samples, unchanged = [], []
+        with quiet():
+            for _ in range(runs):
+                monitor.products_text = None
+                start = time.perf_counter()
+                monitor.parse_stock_page(page)
+                samples.append(time.perf_counter() - start)
+            for _ in range(runs):
+                start = time.perf_counter()
+                monitor.parse_stock_page(page)
+                unchanged.append(time.perf_counter() - start)
+        results[name] = dict(summarize(samples), page_kib=round(len(page) / 1024),
+                             products_unchanged=summarize(unchanged))
+        print(f"  parse {name:8s} {results[name]['p50_ms']:>10.3f} ms p50  {results[name]['p95_ms']:>10.3f} ms p95"
+              f"  (unchanged products {results[name]['products_unchanged']['p50_ms']:.3f} ms p50)")
+    return results
+
+
+def measure(function, runs):
+    """Timing summary for function, plus its peak allocation from one traced run"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dict(summarize(samples), peak_kib=round(peak / 1024))
+
+
+def bench_decode(monitor, iterations):
+    """Full json.loads of goodsDetailData against the partial decode parse_stock_page uses"""
+    results = {}
+    for name in SIZES:
+        page = load_fixture(name)
+        pos = page.find(bot_controller.GOODS_DATA_MARKER) + len(bot_controller.GOODS_DATA_MARKER)
+        blob = page[pos:page.find('</script>', pos)].rstrip().rstrip(';')
+        runs = max(3, iterations if name != 'large' else iterations // 10)
+
+        def products_changed():
+            monitor.products_text = None
+            monitor.decode_goods_data(page, pos)
+
+        variants = {
+            'full_json_loads': lambda: json.loads(blob),
+            'facets_only': lambda: bot_controller.decode_json_keys(page, pos, ('facets',)),
+            'products_changed': products_changed,
+            'products_unchanged': lambda: monitor.decode_goods_data(page, pos),
+        }
+        results[name] = {}
+        with quiet():
+            for variant, function in variants.items():
+                results[name][variant] = measure(function, runs)
+
+        full = results[name]['full_json_loads']
+        for variant, result in results[name].items():
+            saved_time = 100 - result['p50_ms'] / full['p50_ms'] * 100
+            saved_memory = 100 - result['peak_kib'] / full['peak_kib'] * 100 if full['peak_kib'] else 0
+            print(f"  decode {name:8s} {variant:19s} {result['p50_ms']:>10.3f} ms p50 ({saved_time:+6.1f}% saved)"
+                  f"  {result['peak_kib']:>8} KiB peak ({saved_memory:+6.1f}% saved)")
+    return results
+
+
+def bench_tick(monitor, ticks):
+    samples = []
+    with quiet():
+        for _ in range(ticks):
+            start = time.perf_counter()
+            monitor.check_stock()
+            samples.append(time.perf_counter() - start)
+    result = summarize(samples)
+    print(f"  tick           {result['p50_ms']:>10.3f} ms p50  {result['p95_ms']:>10.3f} ms p95")
+    return result
+
+
+def seed_users(monitor, count):
+    cursor = monitor.conn.cursor()
+    cursor.execute('DELETE FROM bot_users')
+    cursor.executemany(
+        'INSERT INTO bot_users (user_id, username, first_name, chat_id) VALUES (?, ?, ?, ?)',
+        ((str(1000000 + i), f'user{i}', 'Bench', str(1000000 + i)) for i in range(count))
+    )
+    monitor.conn.commit()
+    monitor.refresh_user_counters()
+
+
+def bench_broadcast(monitor, user_counts):
+    results = {}
+    for count in user_counts:
+        seed_users(monitor, count)
+        tracemalloc.start()
+        for _ in monitor.iter_active_chat_ids():
+            pass
+        roster_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        limited_before = bot_controller.TELEGRAM_429_TOTAL.value()
+        with quiet():
+            start = time.perf_counter()
+            success_count, total_users = asyncio.run(monitor.broadcast_message('benchmark alert'))
+            elapsed = time.perf_counter() - start
+        results[str(count)] = {
+            'seconds': round(elapsed, 3),
+            'messages_per_second': round(total_users / elapsed, 1),
+            'delivered': success_count,
+            'rate_limited': bot_controller.TELEGRAM_429_TOTAL.value() - limited_before,
+            'roster_peak_kib': round(roster_peak / 1024),
+        }
+        print(f"  broadcast {count:>7d} {elapsed:>10.2f} s   {total_users / elapsed:>10.1f} msg/s  "
+              f"({success_count}/{total_users} delivered, roster walk peak {roster_peak / 1024:.0f} KiB)")
+        if monitor.shards:
+            results[str(count)]['shards'] = {shard.label: dict(shard.stats) for shard in monitor.shards + [monitor.primary_shard]}
+            for line in monitor.last_shard_report.splitlines():
+                print(f"    {line}")
+    return results
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', 'bot_controller.py'], cwd=REPO_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    old, new = flatten(previous['results']), flatten(current['results'])
+    print(f"\nCompared with {previous['revision']} ({previous['timestamp']}):")
+    for key in sorted(new):
+        if key in old and old[key] and not key.endswith('.runs'):
+            delta = (new[key] - old[key]) / old[key] * 100
+            print(f"  {key:45s} {old[key]:>12} -> {new[key]:>12}  ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default='parse,decode,tick,broadcast', help='comma separated benchmarks to run')
+    parser.add_argument('--iterations', type=int, default=200, help='parse iterations per fixture')
+    parser.add_argument('--ticks', type=int, default=100)
+    parser.add_argument('--users', default='10000,100000', help='comma separated broadcast audience sizes')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub latency per Bot API call (seconds)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='fraction of stub calls answered with 429')
+    parser.add_argument('--shards', type=int, default=0, help='broadcast through this many sender bot tokens')
+    parser.add_argument('--shard-rate', type=float, default=0.0,
+                        help='messages per second per sender bot (0 = unlimited)')
+    parser.add_argument('--quick', action='store_true', help='fewer iterations and a 1000 user broadcast')
+    parser.add_argument('--compare', metavar='FILE', help='result file to compare with (default: latest)')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    selected = set(args.only.split(','))
+    if args.quick:
+        args.iterations, args.ticks, args.users = 20, 20, '1000'
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, stub_server(args.latency, args.rate_limit) as base_url:
+        monitor = make_monitor(base_url, os.path.join(tmp, 'bench.db'), args.shards, args.shard_rate)
+        if 'parse' in selected:
+            print('parse:')
+            results['parse'] = bench_parse(monitor, args.iterations)
+        if 'decode' in selected:
+            print('decode:')
+            results['decode'] = bench_decode(monitor, args.iterations)
+        if 'tick' in selected:
+            print('tick:')
+            results['tick'] = bench_tick(monitor, args.ticks)
+        if 'broadcast' in selected:
+            print('broadcast:')
+            results['broadcast'] = bench_broadcast(monitor, [int(n) for n in args.users.split(',')])
+
+    run = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'args': vars(args),
+        'results': results,
+    }
+
+    previous_path = args.compare
+    if previous_path is None:
+        existing = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+        previous_path = existing[-1] if existing else None
+    if previous_path:
+        with open(previous_path) as f:
+            compare(json.load(f), run)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{run['revision']}.json")
+        with open(path, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f'\nSaved {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Local stand-in for the Telegram Bot API (and the Shein category page).
+
+Answers the Bot API methods the bot uses with canned responses, with
+configurable per-call latency and 429 injection, and serves the HTML
+fixtures under /c/<name> so a full check_stock tick runs offline.
+
+    python benchmarks/telegram_stub.py --port 8081 --latency 0.02 --rate-limit 0.01
+
+Point the bot at it with CONFIG['telegram_api_base'] = 'http://127.0.0.1:8081'
+and CONFIG['api_url'] = 'http://127.0.0.1:8081/c/typical'.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from make_fixtures import load_fixture
+
+
+class BotApiStub:
+    """Threaded HTTP server that mimics the Bot API endpoints we call"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, rate_limit=0.0, retry_after=1, seed=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.updates = []
+        self.calls = {}
+        self.calls_by_bot = {}
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._message_id = 0
+        self._fixtures = {}
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_update(self, chat_id, user_id, text):
+        """Queue a text message to be returned by getUpdates"""
+        with self._lock:
+            update_id = len(self.updates) + 1
+            self.updates.append({
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'from': {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'},
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'date': int(time.time()),
+                    'text': text,
+                },
+            })
+
+    def page(self, name):
+        if name not in self._fixtures:
+            self._fixtures[name] = load_fixture(name).encode('utf-8')
+        return self._fixtures[name]
+
+    def handle(self, method, params, token=''):
+        """Return (status, payload) for one Bot API call"""
+        bot_id = token.split(':')[0]
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.calls_by_bot[bot_id] = self.calls_by_bot.get(bot_id, 0) + 1
+            limited = self.rate_limit and method != 'getUpdates' and self._rng.random() < self.rate_limit
+            if limited:
+                self.rate_limited += 1
+            else:
+                self._message_id += 1
+                message_id = self._message_id
+
+        if limited:
+            return 429, {
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }
+
+        chat_id = params.get('chat_id', '0')
+        if method in ('sendMessage', 'editMessageText', 'sendDocument'):
+            return 200, {'ok': True, 'result': {
+                'message_id': int(params.get('message_id', message_id)),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'date': int(time.time()),
+                'text': params.get('text', ''),
+            }}
+        if method == 'getChat':
+            return 200, {'ok': True, 'result': {
+                'id': chat_id, 'type': 'private', 'username': f'user{chat_id}', 'first_name': 'Bench',
+            }}
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {
+                'id': int(bot_id) if bot_id.isdigit() else 1, 'is_bot': True, 'username': 'stub_bot',
+            }}
+        if method == 'getUpdates':
+            offset = int(params.get('offset', 0))
+            with self._lock:
+                result = [u for u in self.updates if u['update_id'] >= offset]
+            return 200, {'ok': True, 'result': result}
+        if method == 'getWebhookInfo':
+            return 200, {'ok': True, 'result': {'url': '', 'pending_update_count': 0}}
+        return 200, {'ok': True, 'result': True}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _params(self, parsed):
+                params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    body = self.rfile.read(length)
+                    if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                        params.update({k: v[-1] for k, v in parse_qs(body.decode('utf-8')).items()})
+                return params
+
+            def _reply(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _dispatch(self):
+                parsed = urlparse(self.path)
+                params = self._params(parsed)
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                parts = parsed.path.strip('/').split('/')
+                if len(parts) == 2 and parts[0] == 'c':
+                    try:
+                        self._reply(200, stub.page(parts[1]), 'text/html; charset=utf-8')
+                    except FileNotFoundError:
+                        self._reply(404, b'not found', 'text/plain')
+                    return
+                if len(parts) == 2 and parts[0].startswith('bot'):
+                    status, payload = stub.handle(parts[1], params, parts[0][3:])
+                    self._reply(status, json.dumps(payload).encode('utf-8'), 'application/json')
+                    return
+                self._reply(404, b'{"ok":false,"error_code":404,"description":"Not Found"}', 'application/json')
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='0 picks a free port')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every call')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='fraction of calls answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    stub = BotApiStub(args.host, args.port, args.latency, args.rate_limit, args.retry_after).start()
+    # First line of output is the base URL so a parent process can read it
+    print(stub.base_url, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,29 @@
+import time
+BOOT_STARTED = time.monotonic()  # Measured before the heavier imports below
+
 import requests
-from bs4 import BeautifulSoup
 import sqlite3
-import time
 import logging
+import logging.handlers
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import os
+import sys
+import signal
+import socket
+import queue
+import atexit
 import threading
 import re
 import asyncio
+import math
+import array
+import uuid
+import io
+import html
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Configuration
 CONFIG = {
@@ -20,31 +35,908 @@ CONFIG = {
     'min_stock_threshold': 1,
     'database_path': '/tmp/shein_monitor.db',
     'min_increase_threshold_men': 2,  # Changed to 2 as requested
-    'min_increase_threshold_women': 50
+    'min_increase_threshold_women': 50,
+    'telegram_api_base': 'https://api.telegram.org',
+    'broadcast_delay_seconds': 0.1,
+    'notification_dedupe_seconds': 3600,
+    'metrics_enabled': True,
+    'metrics_host': '127.0.0.1',
+    'metrics_port': 9108,
+    'log_level': 'INFO',
+    'log_json': False,
+    'log_sample_every': 30,  # Repetitive per-tick lines are logged once per N occurrences
+    'profile_default_ticks': 20,
+    'profile_default_messages': 20,
+    'profile_max_seconds': 600,
+    'bootstrap_cache_seconds': 86400,  # How long cached getMe/webhook results are trusted
+    'leader_election_enabled': True,
+    'leader_lease_seconds': 10,
+    'leader_renew_seconds': 2,
+    'product_diff_enabled': True,  # Diff individual products, not just the gender totals
+    'product_alert_max_items': 8,  # Items named in one alert before "...and N more"
+    # Extra facets to alert on, keyed '<facet>-<value>' as in the page's facets, e.g.
+    # {'facet': 'verticalsizegroupformat-M', 'min_increase': 5, 'audience': 'all', 'label': 'Size M'}
+    # audience is 'all', 'admins' or a list of chat IDs
+    'facet_watchers': [],
+    'users_page_size': 10,
+    'broadcast_chunk_size': 1000,  # Chat IDs read per query while broadcasting
+    # Extra bots that share broadcast fan-out; each user must have started them.
+    # Commands and replies always use telegram_bot_token.
+    'sender_bot_tokens': [],
+    'shard_messages_per_second': 25,  # Per sender bot; Telegram allows about 30
+    'shard_concurrency': 4,  # Parallel requests per sender bot
+    # Opt-in: /status and /check_now keep one message per chat up to date with
+    # editMessageText instead of sending a new message every time
+    'live_status_enabled': False,
+    'live_status_ttl_seconds': 900,  # A live message stops updating this long after its last request
+    'live_status_min_interval_seconds': 10,  # Per chat: at most one edit per interval, newest snapshot wins
+    'live_status_edits_per_second': 5  # All chats together, so edits stay bounded during broadcasts
 }
 
-# Set up logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+GOODS_DATA_MARKER = 'window.goodsDetailData = '
+JSON_DECODER = json.JSONDecoder()
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+SCHEMA_VERSION = 7  # Bump whenever setup_database changes
+
+# Set up logging (handlers are installed by setup_logging in main)
 logger = logging.getLogger(__name__)
 
+class SamplingFilter(logging.Filter):
+    """Pass 1 in `every` records logged with extra={'sample': True}, counted per message"""
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen = {}
+        self.lock = threading.Lock()  # Broadcast and shard worker threads log concurrently
+    
+    def filter(self, record):
+        if not getattr(record, 'sample', False):
+            return True
+        with self.lock:
+            seen = self.seen.get(record.msg, 0)
+            self.seen[record.msg] = seen + 1
+        return seen % self.every == 0
+
+_LOG_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed via extra={...} become keys"""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _LOG_RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def setup_logging(config):
+    """Send all records through a queue so writing to stdout never blocks the monitor"""
+    if config['log_json']:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(config['log_sample_every']))
+    
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(config['log_level'])
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+# Metrics (Prometheus text exposition format, no extra dependency)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(labelnames, values, extra=None):
+    """Render a Prometheus label set like {a="1",b="2"}"""
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+def _format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric:
+    """Base class for a named metric with an optional fixed label set"""
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Gauge(Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._function = None
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function):
+        """Compute the (unlabelled) value lazily on every scrape"""
+        self._function = function
+
+    def render(self):
+        lines = self.header()
+        if self._function is not None:
+            try:
+                lines.append(f"{self.name} {_format_value(self._function())}")
+            except Exception as e:
+                logger.warning("⚠️ Error computing metric %s: %s", self.name, e)
+            return lines
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed buckets"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time spent inside the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric and renders the /metrics payload"""
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+METRICS = MetricsRegistry()
+SHEIN_FETCH_SECONDS = METRICS.register(Histogram(
+    'shein_monitor_fetch_seconds', 'Time spent downloading the Shein category page'))
+SHEIN_PARSE_SECONDS = METRICS.register(Histogram(
+    'shein_monitor_parse_seconds', 'Time spent extracting stock counts from the page', ['strategy']))
+DB_WRITE_SECONDS = METRICS.register(Histogram(
+    'shein_monitor_db_write_seconds', 'Time spent writing to SQLite', ['table']))
+BROADCAST_SECONDS = METRICS.register(Histogram(
+    'shein_monitor_broadcast_duration_seconds', 'Time to send one message to every active user',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)))
+TELEGRAM_SEND_SECONDS = METRICS.register(Histogram(
+    'shein_monitor_telegram_send_seconds', 'Latency of a single Telegram Bot API call', ['method']))
+TICKS_TOTAL = METRICS.register(Counter(
+    'shein_monitor_ticks_total', 'Automatic stock checks performed'))
+ALERTS_TOTAL = METRICS.register(Counter(
+    'shein_monitor_alerts_total', 'Stock alerts raised', ['type']))
+PRODUCT_EVENTS_TOTAL = METRICS.register(Counter(
+    'shein_monitor_product_events_total', 'Product changes found by the product diff', ['kind']))
+SHARD_MESSAGES_TOTAL = METRICS.register(Counter(
+    'shein_monitor_shard_messages_total', 'Broadcast messages per sender shard', ['shard', 'result']))
+FAILURES_TOTAL = METRICS.register(Counter(
+    'shein_monitor_failures_total', 'Failures by stage', ['stage']))
+ALERT_DELIVERY_SECONDS = METRICS.register(Histogram(
+    'shein_monitor_alert_time_to_deliver_seconds', 'Time from stock detection to the last alert delivery',
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)))
+TELEGRAM_429_TOTAL = METRICS.register(Counter(
+    'shein_monitor_telegram_429_total', 'Telegram responses with HTTP 429 Too Many Requests'))
+ACTIVE_USERS = METRICS.register(Gauge(
+    'shein_monitor_active_users', 'Active users who receive alerts'))
+BOOT_TO_FIRST_CHECK_SECONDS = METRICS.register(Gauge(
+    'shein_monitor_boot_to_first_check_seconds', 'Seconds from process start to the first completed stock check'))
+IS_LEADER = METRICS.register(Gauge(
+    'shein_monitor_is_leader', '1 if this process holds the leader lease'))
+LAST_SUCCESS_AGE = METRICS.register(Gauge(
+    'shein_monitor_last_success_age_seconds', 'Seconds since the last successful stock check'))
+
+def decode_json_keys(text, pos, decode=(), locate=()):
+    """Return (values, offsets) for the `decode` and `locate` keys of the JSON object at
+    text[pos], stopping after the last one; raises ValueError if no object starts there"""
+    pos = JSON_WHITESPACE.match(text, pos).end()
+    if text[pos:pos + 1] != '{':
+        raise ValueError(f'expected a JSON object at offset {pos}')
+    pos += 1
+    values, offsets = {}, {}
+    remaining = set(decode) | set(locate)
+    while remaining:
+        pos = JSON_WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] != '"':
+            break  # End of the object
+        key, pos = json.decoder.scanstring(text, pos + 1)
+        pos = JSON_WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] != ':':
+            raise ValueError(f'expected ":" at offset {pos}')
+        pos = JSON_WHITESPACE.match(text, pos + 1).end()
+        
+        remaining.discard(key)
+        if key in locate:
+            offsets[key] = pos
+            if not remaining:
+                break
+        value, pos = JSON_DECODER.raw_decode(text, pos)
+        if key in decode or key in locate:
+            values[key] = value
+        
+        pos = JSON_WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] != ',':
+            break
+        pos += 1
+    return values, offsets
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+def telegram_api_url(token, method, api_base=None):
+    """Build a Bot API method URL (api_base lets benchmarks point at a local stub)"""
+    return f"{api_base or CONFIG['telegram_api_base']}/bot{token}/{method}"
+
+def start_metrics_server(host, port):
+    """Serve METRICS on http://host:port/metrics from a background thread"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = METRICS.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the logs
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.warning("⚠️ Could not start metrics server on %s:%s: %s", host, port, e)
+        return None
+
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    logger.info("📈 Metrics available at http://%s:%s/metrics", host, server.server_address[1])
+    return server
+
+class ProfileSession:
+    """Deterministic cProfile + tracemalloc over the next N monitor ticks and N broadcast sends
+    (on Python 3.12+ cProfile records every thread while enabled, not just the caller's)"""
+    def __init__(self, chat_id, ticks, messages, max_seconds):
+        # Imported here so normal runs never load the profilers
+        import cProfile
+        import tracemalloc
+        
+        self.chat_id = chat_id
+        self.ticks_left = ticks
+        self.messages_left = messages
+        self.ticks_profiled = 0
+        self.messages_profiled = 0
+        self.started = time.time()
+        self.deadline = self.started + max_seconds
+        self.profiler = cProfile.Profile()
+        self.whole_process = sys.version_info >= (3, 12)
+        self.timer = None  # Deadline timer, started by whoever owns the session
+        self._lock = threading.Lock()
+        self._owner = None
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start(10)
+    
+    def begin(self, kind):
+        """Start profiling one 'tick' or 'message'; returns False if it should run unprofiled"""
+        if kind == 'tick' and self.ticks_left <= 0:
+            return False
+        if kind == 'message':
+            if self.messages_left <= 0:
+                return False
+            if self._owner == threading.get_ident():
+                # Sent from inside a profiled tick, so it is already covered
+                self.messages_left -= 1
+                self.messages_profiled += 1
+                return False
+        
+        # One profiled unit at a time (before 3.12 cProfile only follows the enabling thread)
+        if not self._lock.acquire(blocking=False):
+            return False
+        if (self.ticks_left if kind == 'tick' else self.messages_left) <= 0:
+            # close() ran in between
+            self._lock.release()
+            return False
+        try:
+            # 3.12+ refuses to enable while another profiling tool is active
+            self.profiler.enable()
+        except ValueError as e:
+            logger.warning("⚠️ Could not enable the profiler: %s", e)
+            self._lock.release()
+            return False
+        self._owner = threading.get_ident()
+        if kind == 'tick':
+            self.ticks_left -= 1
+            self.ticks_profiled += 1
+        else:
+            self.messages_left -= 1
+            self.messages_profiled += 1
+        return True
+    
+    def end(self):
+        self.profiler.disable()
+        self._owner = None
+        self._lock.release()
+    
+    def close(self):
+        """Wait for the unit being profiled, then profile nothing more"""
+        with self._lock:
+            self.ticks_left = 0
+            self.messages_left = 0
+    
+    def done(self):
+        return self.ticks_left <= 0 and (self.messages_left <= 0 or time.time() > self.deadline)
+    
+    def report(self, top_functions=25, top_allocations=15):
+        """Top functions by cumulative time and top allocation sites"""
+        import pstats
+        import tracemalloc
+        
+        snapshot = tracemalloc.take_snapshot()
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+        
+        stream = io.StringIO()
+        try:
+            stats = pstats.Stats(self.profiler, stream=stream)
+            stats.strip_dirs().sort_stats('cumulative').print_stats(top_functions)
+        except TypeError:
+            # Raised for a profiler that never ran, e.g. a session cut short by stop_monitoring
+            stream.write("Nothing was profiled")
+        
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ])
+        allocations = '\n'.join(str(stat) for stat in snapshot.statistics('lineno')[:top_allocations])
+        
+        scope = "\n(Python 3.12+: other threads active meanwhile are included)" if self.whole_process else ""
+        return (
+            f"Profiled {self.ticks_profiled} ticks and {self.messages_profiled} broadcast messages "
+            f"over {time.time() - self.started:.0f}s{scope}\n\n"
+            f"=== Top functions (cumulative) ===\n{stream.getvalue().strip()}\n\n"
+            f"=== Top allocations ===\n{allocations}\n"
+        )
+
+class SystemClock:
+    """Wall clock used by the monitor; replay swaps in a virtual one"""
+    def time(self):
+        return time.time()
+    
+    def sleep(self, seconds):
+        time.sleep(seconds)
+    
+    def now(self):
+        return datetime.fromtimestamp(self.time())
+
+class LeaderElector:
+    """Lease-based leader election over the shared SQLite database; the holder of the
+    unexpired leader_lease row leads, every other process waits as a standby"""
+    def __init__(self, database_path, on_elected, on_demoted, lease_seconds=10, renew_seconds=2, name='monitor'):
+        self.database_path = database_path
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.name = name
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self.expires_at = 0.0
+        self.stopped = threading.Event()
+        self.thread = None
+        # Autocommit so the explicit BEGIN IMMEDIATE below is the only transaction
+        self.conn = sqlite3.connect(database_path, timeout=renew_seconds, isolation_level=None, check_same_thread=False)
+    
+    def try_acquire(self):
+        """Take or renew the lease; True while we hold it"""
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute(
+                'INSERT OR IGNORE INTO leader_lease (name, holder, expires_at) VALUES (?, ?, 0)',
+                (self.name, self.holder)
+            )
+            cursor.execute(
+                'UPDATE leader_lease SET holder = ?, expires_at = ? WHERE name = ? AND (holder = ? OR expires_at < ?)',
+                (self.holder, now + self.lease_seconds, self.name, self.holder, now)
+            )
+            acquired = cursor.rowcount == 1
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        if acquired:
+            self.expires_at = now + self.lease_seconds
+        return acquired
+    
+    def current_holder(self):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT holder, expires_at FROM leader_lease WHERE name = ?', (self.name,))
+        return cursor.fetchone()
+    
+    def run(self):
+        waiting_logged = False
+        while not self.stopped.is_set():
+            try:
+                held = self.try_acquire()
+            except sqlite3.Error as e:
+                logger.warning("⚠️ Leader lease renewal failed: %s", e)
+                # Keep leading until the lease we already hold runs out
+                held = self.is_leader and time.time() < self.expires_at
+            
+            if held and not self.is_leader:
+                self.is_leader = True
+                waiting_logged = False
+                IS_LEADER.set(1)
+                logger.info("👑 Elected leader (%s)", self.holder)
+                self.on_elected()
+            elif not held and self.is_leader:
+                self.is_leader = False
+                IS_LEADER.set(0)
+                logger.warning("⚠️ Lost the leader lease, switching to standby")
+                self.on_demoted()
+            elif not held and not waiting_logged:
+                waiting_logged = True
+                row = self.current_holder()
+                logger.info("⏳ Standby: leader is %s", row[0] if row else 'unknown')
+            
+            self.stopped.wait(self.renew_seconds)
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+    
+    def release(self):
+        """Stop renewing and expire our lease so a standby takes over right away"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=self.renew_seconds + 1)
+        try:
+            self.conn.execute(
+                'UPDATE leader_lease SET expires_at = 0 WHERE name = ? AND holder = ?',
+                (self.name, self.holder)
+            )
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Could not release leader lease: %s", e)
+        if self.is_leader:
+            self.is_leader = False
+            IS_LEADER.set(0)
+            logger.info("👋 Released leader lease")
+
+class RateLimiter:
+    """Token bucket shared by the worker threads of one sender shard"""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until one send is allowed (rate 0 means unlimited)"""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds):
+        """Hold every worker of the shard, e.g. for a 429 retry_after"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+class BroadcastShard:
+    """One sender bot: its own token, rate limiter and HTTP connection pool"""
+    max_attempts = 3
+    
+    def __init__(self, index, token, config, sender=None, pool_size=None):
+        self.index = index
+        self.label = str(index)
+        self.token = token
+        self.bot_id = token.split(':')[0]
+        self.config = config
+        self.sender = sender
+        self.limiter = RateLimiter(config['shard_messages_per_second'])
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or config['shard_concurrency'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.stats = {'sent': 0, 'failed': 0, 'retried': 0}
+        self.stats_lock = threading.Lock()
+    
+    def count(self, result):
+        SHARD_MESSAGES_TOTAL.inc(shard=self.label, result=result)
+        with self.stats_lock:
+            self.stats[result] += 1
+    
+    def send_message(self, chat_id, text):
+        """Send one message, retrying after 429s; returns the final HTTP status"""
+        payload = {'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'}
+        url = telegram_api_url(self.token, 'sendMessage', self.config['telegram_api_base'])
+        status = 0
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire()
+            try:
+                with TELEGRAM_SEND_SECONDS.time(method='sendMessage'):
+                    if self.sender is not None:
+                        self.sender('sendMessage', payload, None)
+                        status = 200
+                    else:
+                        response = self.session.post(url, data=payload, timeout=10)
+                        status = response.status_code
+            except requests.RequestException as e:
+                logger.debug("ℹ️ Shard %s request error: %s", self.label, e)
+                status = 0
+            
+            if status == 429:
+                TELEGRAM_429_TOTAL.inc()
+                try:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                except ValueError:
+                    retry_after = 1
+                self.limiter.pause(retry_after)
+                if attempt + 1 < self.max_attempts:
+                    self.count('retried')
+                    continue
+            break
+        
+        self.count('sent' if status == 200 else 'failed')
+        return status
+
+class LiveStatusBoard:
+    """One live status message per chat, edited in place at most once per min_interval
+    through a shared rate limiter; message IDs persist in the live_status table"""
+    def __init__(self, monitor):
+        self.monitor = monitor
+        config = monitor.config
+        self.ttl = config['live_status_ttl_seconds']
+        self.min_interval = config['live_status_min_interval_seconds']
+        self.limiter = RateLimiter(config['live_status_edits_per_second'])
+        self.chats = None  # chat_id -> {'message_id', 'expires_at', 'last_edit', 'dirty'}
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+    
+    def ensure_started(self):
+        with self.lock:
+            if self.chats is None:
+                with self.monitor.write_transaction() as cursor:
+                    cursor.execute('DELETE FROM live_status WHERE expires_at < ?', (time.time(),))
+                    cursor.execute('SELECT chat_id, message_id, expires_at FROM live_status')
+                    rows = cursor.fetchall()
+                self.chats = {
+                    chat_id: {'message_id': message_id, 'expires_at': expires_at, 'last_edit': 0.0, 'dirty': False}
+                    for chat_id, message_id, expires_at in rows
+                }
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+    
+    def show(self, chat_id):
+        """Answer /status or /check_now: edit the chat's live message, or send one"""
+        self.ensure_started()
+        chat_id = str(chat_id)
+        expires_at = time.time() + self.ttl
+        with self.lock:
+            state = self.chats.get(chat_id)
+            live = state is not None and state['expires_at'] > time.time()
+            if live:
+                state['expires_at'] = expires_at
+                state['dirty'] = True
+        if live:
+            self.store(chat_id, state['message_id'], expires_at)
+            self.wakeup.set()
+            return
+        
+        response = self.monitor.telegram_request('sendMessage', {
+            'chat_id': chat_id,
+            'text': self.monitor.render_status(),
+            'parse_mode': 'HTML'
+        })
+        message_id = response['result']['message_id']
+        with self.lock:
+            self.chats[chat_id] = {'message_id': message_id, 'expires_at': expires_at, 'last_edit': time.time(), 'dirty': False}
+        self.store(chat_id, message_id, expires_at)
+    
+    def store(self, chat_id, message_id, expires_at):
+        with DB_WRITE_SECONDS.time(table='live_status'), self.monitor.write_transaction() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO live_status (chat_id, message_id, expires_at) VALUES (?, ?, ?)',
+                (chat_id, message_id, expires_at)
+            )
+    
+    def publish(self, snapshot):
+        """Called after every saved check; marks live chats dirty when the snapshot changed"""
+        if snapshot == self.snapshot:
+            return
+        self.snapshot = snapshot
+        if self.chats is None:
+            # Picks up live messages stored before a restart or takeover
+            self.ensure_started()
+        if not self.chats:
+            return
+        with self.lock:
+            for state in self.chats.values():
+                state['dirty'] = True
+        self.wakeup.set()
+    
+    def run(self):
+        while True:
+            self.wakeup.wait(timeout=1)
+            self.wakeup.clear()
+            now = time.time()
+            with self.lock:
+                for chat_id in [c for c, state in self.chats.items() if state['expires_at'] <= now]:
+                    del self.chats[chat_id]
+                due = [
+                    (chat_id, state) for chat_id, state in self.chats.items()
+                    if state['dirty'] and now - state['last_edit'] >= self.min_interval
+                ]
+            if not due:
+                continue
+            
+            # Coalesced: every due chat gets the newest snapshot, rendered once
+            text = self.monitor.render_status()
+            for chat_id, state in due:
+                self.limiter.acquire()
+                state['dirty'] = False
+                state['last_edit'] = time.time()
+                try:
+                    self.monitor.telegram_request('editMessageText', {
+                        'chat_id': chat_id,
+                        'message_id': state['message_id'],
+                        'text': text,
+                        'parse_mode': 'HTML'
+                    })
+                except requests.HTTPError as e:
+                    response = e.response
+                    status = response.status_code if response is not None else 0
+                    body = response.text if response is not None else ''
+                    if status == 429:
+                        # Usually mid-broadcast: hold every edit for retry_after and keep the chat's message
+                        try:
+                            retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                        except ValueError:
+                            retry_after = 1
+                        self.limiter.pause(retry_after)
+                        state['dirty'] = True
+                        state['last_edit'] = 0.0
+                    elif 'not modified' in body:
+                        continue
+                    elif status == 403 or (status == 400 and 'message to edit not found' in body):
+                        # Deleted message or blocked bot: the next /status sends a fresh one
+                        logger.debug("ℹ️ Dropping live status for chat %s: %s", chat_id, e)
+                        with self.lock:
+                            self.chats.pop(chat_id, None)
+                    else:
+                        FAILURES_TOTAL.inc(stage='live_status')
+                        logger.warning("⚠️ Error updating live status for chat %s: %s", chat_id, e, extra={'sample': True})
+                except Exception as e:
+                    FAILURES_TOTAL.inc(stage='live_status')
+                    logger.warning("⚠️ Error updating live status for chat %s: %s", chat_id, e, extra={'sample': True})
+
+class ProductIndex:
+    """Last known (stock level, price) per product code; products that leave the page stay indexed"""
+    def __init__(self, rows=()):
+        self.items = {code: (stock, price) for code, stock, price in rows}
+    
+    @staticmethod
+    def stock_level(product):
+        stock = product.get('stock') or {}
+        level = stock.get('stockLevel')
+        if level is None:
+            return 1 if stock.get('stockLevelStatus', 'inStock') == 'inStock' else 0
+        return level
+    
+    def diff(self, products):
+        """Update the index; return (events, changed rows for product_stock)"""
+        items = self.items
+        events, changed = [], []
+        for product in products:
+            code = product.get('code')
+            if not code:
+                continue
+            current = (self.stock_level(product), (product.get('price') or {}).get('value'))
+            previous = items.get(code)
+            if previous == current:
+                continue
+            
+            items[code] = current
+            stock, price = current
+            changed.append((code, product.get('name', code), product.get('gender', ''), stock, price))
+            if previous is None:
+                kind = 'new' if stock > 0 else None
+            elif previous[0] <= 0 < stock:
+                # Only back-in-stock counts; a level moving 9 -> 10 is not worth an alert
+                kind = 'restock'
+            elif price is not None and previous[1] is not None and price < previous[1] and stock > 0:
+                kind = 'price_drop'
+            else:
+                kind = None
+            if kind:
+                events.append({
+                    'kind': kind,
+                    'code': code,
+                    'name': product.get('name', code),
+                    'gender': product.get('gender', ''),
+                    'stock': stock,
+                    'price': price,
+                    'url': product.get('url', '')
+                })
+        return events, changed
+
 class SheinStockMonitor:
-    def __init__(self, config):
+    def __init__(self, config, fetcher=None, sender=None, clock=None):
+        """fetcher() -> page HTML and sender(method, payload, files) -> Bot API response
+        replace the network calls, so replay and benchmarks can run offline"""
         self.config = config
+        self.fetcher = fetcher or self.fetch_shein_page
+        self.sender = sender
+        self.clock = clock or SystemClock()
         self.monitoring = False
         self.monitor_thread = None
         self.telegram_running = False
+        self.telegram_thread = None
+        self.db_lock = threading.Lock()
         self.last_notified_stock = 0  # Track last notified stock level
+        self.last_success_time = self.clock.time()
+        self.profile_session = None  # Set by /profile; None means zero profiling overhead
+        self.profile_lock = threading.Lock()
+        self.shards = [
+            BroadcastShard(index, token, config, sender)
+            for index, token in enumerate(config.get('sender_bot_tokens') or [])
+        ]
+        # 403 fallback for users who never started their sender bot; every
+        # shard's workers share it, so it has its own limiter and pool
+        self.primary_shard = BroadcastShard(
+            'primary', config['telegram_bot_token'], config, sender,
+            pool_size=len(self.shards) * config['shard_concurrency']
+        ) if self.shards else None
+        self.last_shard_report = ''
+        self.boot_reported = False
+        self.product_index = None  # Loaded from product_stock on the first diff
+        self.facet_counts = None  # Last known count per facet, loaded from facet_history
+        self.products_text = None  # Raw product list as last decoded, to skip unchanged ones
         self.setup_database()
-        print("🤖 Shein Monitor initialized")
+        self.live_status = LiveStatusBoard(self) if config.get('live_status_enabled') else None
+        ACTIVE_USERS.set(self.get_user_count())
+        LAST_SUCCESS_AGE.set_function(lambda: self.clock.time() - self.last_success_time)
+        logger.info("🤖 Shein Monitor initialized")
     
     def setup_database(self):
         """Initialize SQLite database with users table"""
         self.conn = sqlite3.connect(self.config['database_path'], check_same_thread=False)
         cursor = self.conn.cursor()
         
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] == SCHEMA_VERSION:
+            logger.info("✅ Database schema up to date")
+            return
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS stock_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -71,6 +963,23 @@ class SheinStockMonitor:
             )
         ''')
         
+        # Keyset pagination for /users seeks into this index and walks it newest
+        # first (the rowid tiebreak is implicit). It is not covering: each page
+        # reads users_page_size + 1 rows from the table by rowid, which is cheap
+        # and keeps the index from duplicating names for every user
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_bot_users_active_joined
+            ON bot_users (is_active, joined_date)
+        ''')
+        
+        # Counters kept up to date by add_user/deactivate_user so admin commands never COUNT(*)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bot_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER DEFAULT 0
+            )
+        ''')
+        
         # Add table for tracking notifications to prevent duplicates
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS stock_notifications (
@@ -82,42 +991,309 @@ class SheinStockMonitor:
             )
         ''')
         
+        # Detection-to-delivery latency per alert
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alert_latency (
+                alert_id TEXT PRIMARY KEY,
+                alert_type TEXT,
+                detected_at REAL,
+                completed_at REAL,
+                recipients INTEGER DEFAULT 0,
+                delivered INTEGER DEFAULT 0,
+                p50_seconds REAL,
+                p95_seconds REAL,
+                max_seconds REAL
+            )
+        ''')
+        
+        # Cached bootstrap state (bot identity, webhook status, update offset)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bot_state (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at REAL
+            )
+        ''')
+        
+        # Last known stock and price per product, the baseline for the product diff
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS product_stock (
+                code TEXT PRIMARY KEY,
+                name TEXT,
+                gender TEXT,
+                stock_level INTEGER,
+                price REAL,
+                updated_at TIMESTAMP
+            )
+        ''')
+        
+        # Facet counts over time; a row is written only when a count changes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS facet_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                facet_key TEXT,
+                count INTEGER
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_facet_history_key
+            ON facet_history (facet_key, id)
+        ''')
+        
+        # Message ID of each chat's live status message (live_status_enabled)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS live_status (
+                chat_id TEXT PRIMARY KEY,
+                message_id INTEGER,
+                expires_at REAL
+            )
+        ''')
+        
+        # Sender bots that answered 403 for a chat; broadcasts route those chats to the primary bot
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sender_refusals (
+                chat_id TEXT,
+                bot_id TEXT,
+                PRIMARY KEY (chat_id, bot_id)
+            )
+        ''')
+        
+        # Leader lease shared by every process using this database
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leader_lease (
+                name TEXT PRIMARY KEY,
+                holder TEXT,
+                expires_at REAL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_stock_notifications_lookup
+            ON stock_notifications (notification_type, stock_level, timestamp)
+        ''')
+        
+        # WAL lets standby processes read while the leader writes
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
         self.conn.commit()
-        print("✅ Database setup completed")
+        # Existing databases get their counters seeded once, on upgrade
+        self.refresh_user_counters()
+        logger.info("✅ Database setup completed")
+    
+    @contextmanager
+    def write_transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT on the shared connection. Every write goes
+        through here, so db_lock keeps threads from committing each other's work."""
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+    
+    def refresh_user_counters(self):
+        """Recount bot_counters from bot_users (migrations and bulk imports only)"""
+        with self.write_transaction() as cursor:
+            cursor.execute('''
+                INSERT OR REPLACE INTO bot_counters (name, value)
+                SELECT 'total_users', COUNT(*) FROM bot_users
+                UNION ALL
+                SELECT 'active_users', COUNT(*) FROM bot_users WHERE is_active = TRUE
+            ''')
     
     def add_user(self, user_id, username, first_name, last_name, chat_id):
         """Add or update a user in the database"""
-        cursor = self.conn.cursor()
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO bot_users 
-                (user_id, username, first_name, last_name, chat_id, is_active, last_interaction)
-                VALUES (?, ?, ?, ?, ?, TRUE, CURRENT_TIMESTAMP)
-            ''', (str(user_id), username, first_name, last_name, str(chat_id)))
-            self.conn.commit()
-            print(f"✅ User added/updated: {user_id} ({username})")
+            with self.write_transaction() as cursor:
+                cursor.execute('SELECT is_active FROM bot_users WHERE user_id = ?', (str(user_id),))
+                existing = cursor.fetchone()
+                # An upsert keeps the row id and joined_date, which /users pages by
+                cursor.execute('''
+                    INSERT INTO bot_users 
+                    (user_id, username, first_name, last_name, chat_id, is_active, last_interaction)
+                    VALUES (?, ?, ?, ?, ?, TRUE, CURRENT_TIMESTAMP)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        username = excluded.username,
+                        first_name = excluded.first_name,
+                        last_name = excluded.last_name,
+                        chat_id = excluded.chat_id,
+                        is_active = TRUE,
+                        last_interaction = CURRENT_TIMESTAMP
+                ''', (str(user_id), username, first_name, last_name, str(chat_id)))
+                if existing is None:
+                    cursor.execute("UPDATE bot_counters SET value = value + 1 WHERE name IN ('total_users', 'active_users')")
+                elif not existing[0]:
+                    cursor.execute("UPDATE bot_counters SET value = value + 1 WHERE name = 'active_users'")
+            logger.debug("✅ User added/updated: %s (%s)", user_id, username)
             return True
         except Exception as e:
-            print(f"❌ Error adding user: {e}")
+            logger.error("❌ Error adding user: %s", e)
             return False
     
-    def get_all_active_users(self):
-        """Get all active users who should receive notifications"""
+    def deactivate_user(self, chat_id):
+        """Stop sending to a chat that blocked the bot; returns True if it was active"""
+        with self.write_transaction() as cursor:
+            cursor.execute('UPDATE bot_users SET is_active = FALSE WHERE chat_id = ? AND is_active = TRUE', (str(chat_id),))
+            deactivated = cursor.rowcount
+            if deactivated:
+                cursor.execute("UPDATE bot_counters SET value = value - ? WHERE name = 'active_users'", (deactivated,))
+        if deactivated:
+            logger.info("🚫 Deactivated chat %s (bot blocked)", chat_id)
+        return deactivated > 0
+    
+    def iter_active_chat_ids(self, chunk_size=None):
+        """Yield the chat ID of every active user, chunk_size rows at a time by keyset on the row id"""
+        chunk_size = chunk_size or self.config['broadcast_chunk_size']
+        last_id = 0
+        while True:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'SELECT id, chat_id FROM bot_users WHERE is_active = TRUE AND id > ? ORDER BY id LIMIT ?',
+                (last_id, chunk_size)
+            )
+            rows = cursor.fetchall()
+            for last_id, chat_id in rows:
+                yield chat_id
+            if len(rows) < chunk_size:
+                return
+    
+    def iter_broadcast_roster(self, chunk_size=None):
+        """Like iter_active_chat_ids, but yield (chat_id, refused) where refused
+        is the set of sender bot IDs that answered 403 for the chat"""
+        chunk_size = chunk_size or self.config['broadcast_chunk_size']
+        last_id = 0
+        while True:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT u.id, u.chat_id, GROUP_CONCAT(r.bot_id) FROM bot_users u
+                LEFT JOIN sender_refusals r ON r.chat_id = u.chat_id
+                WHERE u.is_active = TRUE AND u.id > ?
+                GROUP BY u.id ORDER BY u.id LIMIT ?
+            ''', (last_id, chunk_size))
+            rows = cursor.fetchall()
+            for last_id, chat_id, refused in rows:
+                yield chat_id, set(refused.split(',')) if refused else ()
+            if len(rows) < chunk_size:
+                return
+    
+    def record_sender_refusals(self, refusals):
+        """Remember (chat_id, bot_id) pairs whose sender bot answered 403"""
+        if not refusals:
+            return
+        with self.write_transaction() as cursor:
+            cursor.executemany('INSERT OR IGNORE INTO sender_refusals (chat_id, bot_id) VALUES (?, ?)', refusals)
+    
+    def get_user_count(self, counter='active_users'):
+        """Get the number of active (or, with counter='total_users', all) users"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT user_id, username, first_name, chat_id FROM bot_users WHERE is_active = TRUE')
-        users = cursor.fetchall()
-        return users
+        cursor.execute('SELECT value FROM bot_counters WHERE name = ?', (counter,))
+        result = cursor.fetchone()
+        user_count = result[0] if result else 0
+        if counter == 'active_users':
+            ACTIVE_USERS.set(user_count)
+        return user_count
+    
+    def get_users_page(self, after=None, before=None, limit=10):
+        """One page of active users, newest first, by keyset on (joined_date, id);
+        returns (rows, has_newer, has_older)"""
+        cursor = self.conn.cursor()
+        query = 'SELECT id, user_id, username, first_name, joined_date FROM bot_users WHERE is_active = TRUE'
+        if before is not None:
+            cursor.execute(f'{query} AND (joined_date, id) > (?, ?) ORDER BY joined_date, id LIMIT ?', (*before, limit + 1))
+            rows = cursor.fetchall()
+            return rows[:limit][::-1], len(rows) > limit, True
+        if after is not None:
+            cursor.execute(f'{query} AND (joined_date, id) < (?, ?) ORDER BY joined_date DESC, id DESC LIMIT ?', (*after, limit + 1))
+        else:
+            cursor.execute(f'{query} ORDER BY joined_date DESC, id DESC LIMIT ?', (limit + 1,))
+        rows = cursor.fetchall()
+        return rows[:limit], after is not None, len(rows) > limit
+    
+    def render_users_page(self, after=None, before=None):
+        """Text and inline keyboard for one /users page"""
+        rows, has_newer, has_older = self.get_users_page(after, before, self.config['users_page_size'])
+        if not rows:
+            return "❌ No users found in the database.", None
+        user_count = self.get_user_count()
+        inactive_count = self.get_user_count('total_users') - user_count
+        
+        user_list = "\n".join(
+            f"• {html.escape(first_name or '')} (@{html.escape(username or '')}) - {user_id}"
+            for _, user_id, username, first_name, _ in rows
+        )
+        users_message = f"""
+👥 USER STATISTICS
+
+📊 Total Users: {user_count}
+🚫 Inactive Users: {inactive_count}
+
+👤 Recent Users:
+{user_list}
+
+⏰ Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        """.strip()
+        
+        buttons = []
+        if has_newer:
+            first = rows[0]
+            buttons.append({'text': '⬅️ Newer', 'callback_data': f"users:before:{first[4]}|{first[0]}"})
+        if has_older:
+            last = rows[-1]
+            buttons.append({'text': 'Older ➡️', 'callback_data': f"users:after:{last[4]}|{last[0]}"})
+        return users_message, ({'inline_keyboard': [buttons]} if buttons else None)
     
-    def get_user_count(self):
-        """Get total number of active users"""
+    def get_state(self, key, max_age=None):
+        """Read a cached bootstrap value, or None if missing or older than max_age seconds"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM bot_users WHERE is_active = TRUE')
-        return cursor.fetchone()[0]
+        cursor.execute('SELECT value, updated_at FROM bot_state WHERE key = ?', (key,))
+        result = cursor.fetchone()
+        if result is None:
+            return None
+        value, updated_at = result
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        return json.loads(value)
+    
+    def set_state(self, key, value):
+        """Cache a bootstrap value (anything JSON serialisable)"""
+        with DB_WRITE_SECONDS.time(table='bot_state'), self.write_transaction() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO bot_state (key, value, updated_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time())
+            )
     
     def is_admin(self, user_id):
         """Check if user is admin"""
         return str(user_id) in self.config['admin_user_ids']
     
+    def index_facets(self, data):
+        """Flatten data['facets'] (keyed or list layout) into {'<facet>-<value>': count} in one pass"""
+        facets = data.get('facets')
+        counts = {}
+        if isinstance(facets, dict):
+            groups = facets.items()
+        elif isinstance(facets, list):
+            groups = ((facet.get('code', ''), facet) for facet in facets if isinstance(facet, dict))
+        else:
+            return counts
+        
+        for code, facet in groups:
+            values = facet.get('values') if isinstance(facet, dict) else None
+            if isinstance(values, dict):
+                for key, value in values.items():
+                    if isinstance(value, dict) and 'count' in value:
+                        counts[key] = value['count']
+            elif isinstance(values, list):
+                for value in values:
+                    if isinstance(value, dict) and 'count' in value:
+                        counts[f"{code}-{value.get('code', value.get('name'))}"] = value['count']
+        return counts
+    
     def extract_men_count(self, data):
         """Extract ONLY men count from the JSON data"""
         men_count = 0
@@ -127,7 +1303,7 @@ class SheinStockMonitor:
             if 'genderfilter-Men' in data:
                 men_data = data.get('genderfilter-Men', {})
                 men_count = men_data.get('count', 0)
-                print(f"✅ Found men count in genderfilter-Men: {men_count}")
+                logger.debug("✅ Found men count in genderfilter-Men: %s", men_count)
                 return men_count
             
             # Method 2: Search in nested objects
@@ -138,7 +1314,7 @@ class SheinStockMonitor:
                         if 'genderfilter-Men' in key or ('name' in value and value.get('name') == 'Men'):
                             men_count = value.get('count', 0)
                             if men_count > 0:
-                                print(f"✅ Found men count in {key}: {men_count}")
+                                logger.debug("✅ Found men count in %s: %s", key, men_count)
                                 return men_count
             
             # Method 3: Regex search in string representation
@@ -147,7 +1323,7 @@ class SheinStockMonitor:
             men_match = re.search(men_pattern, data_str)
             if men_match:
                 men_count = int(men_match.group(1))
-                print(f"✅ Found men count via regex: {men_count}")
+                logger.debug("✅ Found men count via regex: %s", men_count)
                 return men_count
             
             # Method 4: Alternative regex pattern
@@ -155,13 +1331,13 @@ class SheinStockMonitor:
             men_match2 = re.search(men_pattern2, data_str)
             if men_match2:
                 men_count = int(men_match2.group(1))
-                print(f"✅ Found men count via alternative regex: {men_count}")
+                logger.debug("✅ Found men count via alternative regex: %s", men_count)
                 return men_count
                 
         except Exception as e:
-            print(f"⚠️ Error extracting men count: {e}")
+            logger.warning("⚠️ Error extracting men count: %s", e)
         
-        print(f"ℹ️ Men count not found, defaulting to 0")
+        logger.debug("ℹ️ Men count not found, defaulting to 0")
         return 0
     
     def extract_women_count(self, data):
@@ -173,7 +1349,7 @@ class SheinStockMonitor:
             if 'genderfilter-Women' in data:
                 women_data = data.get('genderfilter-Women', {})
                 women_count = women_data.get('count', 0)
-                print(f"✅ Found women count in genderfilter-Women: {women_count}")
+                logger.debug("✅ Found women count in genderfilter-Women: %s", women_count)
                 return women_count
             
             # Method 2: Search in nested objects
@@ -184,7 +1360,7 @@ class SheinStockMonitor:
                         if 'genderfilter-Women' in key or ('name' in value and value.get('name') == 'Women'):
                             women_count = value.get('count', 0)
                             if women_count > 0:
-                                print(f"✅ Found women count in {key}: {women_count}")
+                                logger.debug("✅ Found women count in %s: %s", key, women_count)
                                 return women_count
             
             # Method 3: Regex search in string representation
@@ -193,7 +1369,7 @@ class SheinStockMonitor:
             women_match = re.search(women_pattern, data_str)
             if women_match:
                 women_count = int(women_match.group(1))
-                print(f"✅ Found women count via regex: {women_count}")
+                logger.debug("✅ Found women count via regex: %s", women_count)
                 return women_count
             
             # Method 4: Alternative regex pattern
@@ -201,75 +1377,126 @@ class SheinStockMonitor:
             women_match2 = re.search(women_pattern2, data_str)
             if women_match2:
                 women_count = int(women_match2.group(1))
-                print(f"✅ Found women count via alternative regex: {women_count}")
+                logger.debug("✅ Found women count via alternative regex: %s", women_count)
                 return women_count
                 
         except Exception as e:
-            print(f"⚠️ Error extracting women count: {e}")
+            logger.warning("⚠️ Error extracting women count: %s", e)
         
-        print(f"ℹ️ Women count not found, defaulting to 0")
+        logger.debug("ℹ️ Women count not found, defaulting to 0")
         return 0
     
-    def get_shein_stock_count(self):
-        """Get men's stock count from Shein API"""
+    def fetch_shein_page(self):
+        """Download the SVerse category page and return its HTML"""
+        headers = {
+            'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+            'accept-language': 'en-US,en;q=0.9',
+            'cache-control': 'no-cache',
+            'pragma': 'no-cache',
+            'priority': 'u=0, i',
+            'sec-ch-ua': '"Google Chrome";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
+            'sec-ch-ua-mobile': '?0',
+            'sec-ch-ua-platform': '"Windows"',
+            'sec-fetch-dest': 'document',
+            'sec-fetch-mode': 'navigate',
+            'sec-fetch-site': 'same-origin',
+            'sec-fetch-user': '?1',
+            'upgrade-insecure-requests': '1',
+            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36'
+        }
+        
+        response = requests.get(
+            self.config['api_url'],
+            headers=headers,
+            timeout=15
+        )
+        response.raise_for_status()
+        return response.text
+    
+    def parse_stock_page(self, page_text, with_products=True):
+        """Extract (total, men, women, products, facets) from the category page HTML;
+        products is None when unchanged or not asked for, facets when the script is missing"""
+        start = time.perf_counter()
+        # Find the goodsDetailData assignment directly in the raw HTML; building
+        # a BeautifulSoup tree of the whole page just to reach one script tag
+        # cost more than everything else in a tick
+        marker = page_text.find(GOODS_DATA_MARKER)
+        if marker != -1:
+            try:
+                data, strategy = self.decode_goods_data(page_text, marker + len(GOODS_DATA_MARKER), with_products)
+                if isinstance(data, dict):
+                    products = data.get('products') if with_products else None
+                    facet_counts = self.index_facets(data)
+                    # The older lookups only run if the page layout stops matching the facet index
+                    men_count = facet_counts.get('genderfilter-Men')
+                    if men_count is None:
+                        men_count = self.extract_men_count(data)
+                    women_count = facet_counts.get('genderfilter-Women')
+                    if women_count is None:
+                        women_count = self.extract_women_count(data)
+                    total_stock = men_count + women_count
+                    SHEIN_PARSE_SECONDS.observe(time.perf_counter() - start, strategy=strategy)
+                    logger.debug("✅ Found men count: %s, Women count: %s, Total: %s", men_count, women_count, total_stock)
+                    return total_stock, men_count, women_count, products, facet_counts
+            except json.JSONDecodeError as e:
+                logger.warning("⚠️ Error parsing script data: %s", e, extra={'sample': True})
+        
+        # Fallback: Search in response text
+        men_count = self.extract_men_count_from_text(page_text)
+        women_count = self.extract_women_count_from_text(page_text)
+        total_stock = men_count + women_count
+        SHEIN_PARSE_SECONDS.observe(time.perf_counter() - start, strategy='text_regex')
+        
+        logger.debug("✅ Found via text search - Men: %s, Women: %s, Total: %s", men_count, women_count, total_stock)
+        return total_stock, men_count, women_count, None, None
+    
+    def decode_goods_data(self, page_text, pos, with_products=True):
+        """Decode the facets (and the product list, if its raw text changed) from goodsDetailData;
+        returns (data, strategy)"""
+        # products_text must match what the diff last saw, so only diffing ticks touch the product list
+        locate = ('products',) if with_products and self.config['product_diff_enabled'] else ()
         try:
-            headers = {
-                'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                'accept-language': 'en-US,en;q=0.9',
-                'cache-control': 'no-cache',
-                'pragma': 'no-cache',
-                'priority': 'u=0, i',
-                'sec-ch-ua': '"Google Chrome";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"Windows"',
-                'sec-fetch-dest': 'document',
-                'sec-fetch-mode': 'navigate',
-                'sec-fetch-site': 'same-origin',
-                'sec-fetch-user': '?1',
-                'upgrade-insecure-requests': '1',
-                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36'
-            }
-            
-            response = requests.get(
-                self.config['api_url'],
-                headers=headers,
-                timeout=15
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            scripts = soup.find_all('script')
-            for script in scripts:
-                script_content = script.string
-                if script_content and 'facets' in script_content and 'totalResults' in script_content:
-                    try:
-                        if 'window.goodsDetailData' in script_content:
-                            json_str = script_content.split('window.goodsDetailData = ')[1].split(';')[0]
-                            data = json.loads(json_str)
-                            men_count = self.extract_men_count(data)
-                            women_count = self.extract_women_count(data)
-                            total_stock = men_count + women_count
-                            print(f"✅ Found men count: {men_count}, Women count: {women_count}, Total: {total_stock}")
-                            return total_stock, men_count, women_count
-                    except (json.JSONDecodeError, IndexError, KeyError) as e:
-                        print(f"⚠️ Error parsing script data: {e}")
-                        continue
-            
-            # Fallback: Search in response text
-            response_text = response.text
-            men_count = self.extract_men_count_from_text(response_text)
-            women_count = self.extract_women_count_from_text(response_text)
-            total_stock = men_count + women_count
-            
-            print(f"✅ Found via text search - Men: {men_count}, Women: {women_count}, Total: {total_stock}")
-            return total_stock, men_count, women_count
-            
+            data, offsets = decode_json_keys(page_text, pos, ('facets',), locate)
+        except ValueError as e:
+            logger.debug("ℹ️ Partial decode failed (%s), decoding the full payload", e)
+            data, offsets = {}, {}
+        if 'facets' not in data:
+            data, _ = JSON_DECODER.raw_decode(page_text, pos)
+            return data, 'script_json'
+        
+        if 'products' in offsets and 'products' not in data:
+            start = offsets['products']
+            previous = self.products_text
+            # </script> cannot occur inside an inline script, so it bounds the product list
+            if (previous is not None and page_text.startswith(previous, start)
+                    and page_text.startswith('</script>', start + len(previous))):
+                data['products'] = None
+            else:
+                data['products'], _ = JSON_DECODER.raw_decode(page_text, start)
+                end = page_text.find('</script>', start)
+                self.products_text = page_text[start:end] if end != -1 else None
+        return data, 'script_partial'
+    
+    def get_shein_stock_count(self, with_products=True):
+        """Fetch and parse the page; returns (total, men, women, products, facets)"""
+        try:
+            with SHEIN_FETCH_SECONDS.time():
+                page_text = self.fetcher()
         except requests.RequestException as e:
-            print(f"❌ Error making API request: {e}")
-            return 0, 0, 0
+            FAILURES_TOTAL.inc(stage='fetch')
+            logger.error("❌ Error making API request: %s", e, extra={'sample': True})
+            return 0, 0, 0, None, None
         except Exception as e:
-            print(f"❌ Unexpected error during API call: {e}")
-            return 0, 0, 0
+            FAILURES_TOTAL.inc(stage='fetch')
+            logger.error("❌ Unexpected error during API call: %s", e, extra={'sample': True})
+            return 0, 0, 0, None, None
+        
+        try:
+            return self.parse_stock_page(page_text, with_products)
+        except Exception as e:
+            FAILURES_TOTAL.inc(stage='parse')
+            logger.error("❌ Unexpected error while parsing stock page: %s", e, extra={'sample': True})
+            return 0, 0, 0, None, None
     
     def extract_men_count_from_text(self, response_text):
         """Extract men count from response text using regex"""
@@ -280,18 +1507,18 @@ class SheinStockMonitor:
             men_match = re.search(men_pattern, response_text)
             if men_match:
                 men_count = int(men_match.group(1))
-                print(f"✅ Found men count via text regex: {men_count}")
+                logger.debug("✅ Found men count via text regex: %s", men_count)
                 return men_count
             
             men_pattern2 = r'"name":"Men"[^}]*"count":\s*(\d+)'
             men_match2 = re.search(men_pattern2, response_text)
             if men_match2:
                 men_count = int(men_match2.group(1))
-                print(f"✅ Found men count via alternative text regex: {men_count}")
+                logger.debug("✅ Found men count via alternative text regex: %s", men_count)
                 return men_count
                 
         except Exception as e:
-            print(f"⚠️ Error extracting men count from text: {e}")
+            logger.warning("⚠️ Error extracting men count from text: %s", e)
         
         return men_count
     
@@ -304,25 +1531,30 @@ class SheinStockMonitor:
             women_match = re.search(women_pattern, response_text)
             if women_match:
                 women_count = int(women_match.group(1))
-                print(f"✅ Found women count via text regex: {women_count}")
+                logger.debug("✅ Found women count via text regex: %s", women_count)
                 return women_count
             
             women_pattern2 = r'"name":"Women"[^}]*"count":\s*(\d+)'
             women_match2 = re.search(women_pattern2, response_text)
             if women_match2:
                 women_count = int(women_match2.group(1))
-                print(f"✅ Found women count via alternative text regex: {women_count}")
+                logger.debug("✅ Found women count via alternative text regex: %s", women_count)
                 return women_count
                 
         except Exception as e:
-            print(f"⚠️ Error extracting women count from text: {e}")
+            logger.warning("⚠️ Error extracting women count from text: %s", e)
         
         return women_count
     
+    def db_timestamp(self, seconds_ago=0):
+        """UTC timestamp string in SQLite's CURRENT_TIMESTAMP format, from self.clock"""
+        moment = datetime.fromtimestamp(self.clock.time() - seconds_ago, timezone.utc)
+        return moment.strftime('%Y-%m-%d %H:%M:%S')
+    
     def get_previous_stock(self):
         """Get the last recorded stock count from database"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT total_stock, men_count, women_count FROM stock_history ORDER BY timestamp DESC LIMIT 1')
+        cursor.execute('SELECT total_stock, men_count, women_count FROM stock_history ORDER BY id DESC LIMIT 1')
         result = cursor.fetchone()
         if result:
             return result[0], result[1], result[2]
@@ -330,47 +1562,209 @@ class SheinStockMonitor:
     
     def save_current_stock(self, current_stock, men_count, women_count, change=0, notified=False):
         """Save current stock count to database"""
-        cursor = self.conn.cursor()
-        cursor.execute('INSERT INTO stock_history (total_stock, men_count, women_count, stock_change, notified) VALUES (?, ?, ?, ?, ?)', 
-                      (current_stock, men_count, women_count, change, notified))
-        self.conn.commit()
+        with DB_WRITE_SECONDS.time(table='stock_history'), self.write_transaction() as cursor:
+            cursor.execute('INSERT INTO stock_history (timestamp, total_stock, men_count, women_count, stock_change, notified) VALUES (?, ?, ?, ?, ?, ?)', 
+                          (self.db_timestamp(), current_stock, men_count, women_count, change, notified))
+        if self.live_status is not None:
+            self.live_status.publish((current_stock, men_count, women_count))
     
-    def has_stock_been_notified(self, stock_level, notification_type="men_stock"):
-        """Check if we've already notified for this specific stock level"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'SELECT id FROM stock_notifications WHERE stock_level = ? AND notification_type = ? AND timestamp > datetime("now", "-1 hour")',
-            (stock_level, notification_type)
-        )
-        return cursor.fetchone() is not None
+    def diff_products(self, products):
+        """Diff a parsed product list against product_stock and return the events
+        (none for the first diff, which only records the baseline)"""
+        if not products or not self.config['product_diff_enabled']:
+            return []
+        
+        if self.product_index is None:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT code, stock_level, price FROM product_stock')
+            self.product_index = ProductIndex(cursor.fetchall())
+        baseline = not self.product_index.items
+        
+        events, changed = self.product_index.diff(products)
+        if changed:
+            now = self.db_timestamp()
+            with DB_WRITE_SECONDS.time(table='product_stock'), self.write_transaction() as cursor:
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO product_stock (code, name, gender, stock_level, price, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    [row + (now,) for row in changed]
+                )
+        
+        if baseline:
+            logger.info("📦 Product baseline recorded: %s products", len(changed))
+            return []
+        for event in events:
+            PRODUCT_EVENTS_TOTAL.inc(kind=event['kind'])
+        if events:
+            logger.info("📦 Product changes: %s", ', '.join(f"{e['kind']} {e['code']}" for e in events[:10]))
+        return events
+    
+    def update_facets(self, counts):
+        """Record changed facet counts and return (watcher, previous, current) for
+        every watcher whose facet rose by at least its min_increase"""
+        if counts is None:
+            return []
+        
+        if self.facet_counts is None:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'SELECT facet_key, count FROM facet_history WHERE id IN (SELECT MAX(id) FROM facet_history GROUP BY facet_key)'
+            )
+            self.facet_counts = dict(cursor.fetchall())
+        previous = self.facet_counts
+        
+        changed = [(key, count) for key, count in counts.items() if previous.get(key) != count]
+        # A facet value missing from the page (e.g. a sold out size) counts as 0
+        changed += [(key, 0) for key in previous.keys() - counts.keys() if previous[key] != 0]
+        if changed:
+            now = self.db_timestamp()
+            with DB_WRITE_SECONDS.time(table='facet_history'), self.write_transaction() as cursor:
+                cursor.executemany(
+                    'INSERT INTO facet_history (timestamp, facet_key, count) VALUES (?, ?, ?)',
+                    [(now, key, count) for key, count in changed]
+                )
+        
+        triggered = []
+        if previous:
+            for watcher in self.config['facet_watchers']:
+                key = watcher['facet']
+                before, after = previous.get(key, 0), counts.get(key, 0)
+                if after - before >= watcher.get('min_increase', 1):
+                    triggered.append((watcher, before, after))
+        previous.update(changed)
+        return triggered
     
-    def record_notification(self, stock_level, notification_type="men_stock"):
-        """Record that we've sent a notification for this stock level"""
+    def format_product_events(self, events):
+        """HTML lines naming the items behind an alert"""
+        if not events:
+            return ''
+        origin = '/'.join(self.config['api_url'].split('/')[:3])
+        labels = {'new': '🆕', 'restock': '🔄', 'price_drop': '💸'}
+        limit = self.config['product_alert_max_items']
+        lines = []
+        for event in events[:limit]:
+            name = html.escape(event['name'])
+            if event['url']:
+                name = f'<a href="{html.escape(origin + event["url"])}">{name}</a>'
+            price = f" • Rs.{event['price']:g}" if event['price'] is not None else ''
+            lines.append(f"{labels[event['kind']]} {name}{price}")
+        if len(events) > limit:
+            lines.append(f"…and {len(events) - limit} more")
+        return '\n'.join(lines)
+    
+    def claim_notification(self, stock_level, notification_type="men_stock"):
+        """Atomically record a notification unless one was sent inside the dedupe window;
+        True means we should send it"""
+        since = self.db_timestamp(self.config['notification_dedupe_seconds'])
+        with DB_WRITE_SECONDS.time(table='stock_notifications'), self.write_transaction() as cursor:
+            cursor.execute(
+                '''INSERT INTO stock_notifications (stock_level, notification_type, timestamp)
+                   SELECT ?, ?, ? WHERE NOT EXISTS (
+                       SELECT 1 FROM stock_notifications
+                       WHERE notification_type = ? AND stock_level = ? AND timestamp > ?
+                   )''',
+                (stock_level, notification_type, self.db_timestamp(), notification_type, stock_level, since)
+            )
+            claimed = cursor.rowcount == 1
+        return claimed
+    
+    def new_alert(self, alert_type, detected_at):
+        """Create the tracking record for an alert raised by check_stock"""
+        return {
+            'id': uuid.uuid4().hex[:12],
+            'type': alert_type,
+            'detected_at': detected_at,
+            'stats': None
+        }
+    
+    def record_alert_latency(self, alert, delivered_at, total_users):
+        """Store p50/p95/max time-to-deliver for an alert and return the stats"""
+        latencies = sorted(t - alert['detected_at'] for t in delivered_at)
+        stats = {
+            'alert_id': alert['id'],
+            'alert_type': alert['type'],
+            'recipients': total_users,
+            'delivered': len(latencies),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'max': latencies[-1] if latencies else 0.0
+        }
+        if latencies:
+            ALERT_DELIVERY_SECONDS.observe(stats['max'])
+        
+        with DB_WRITE_SECONDS.time(table='alert_latency'), self.write_transaction() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO alert_latency (alert_id, alert_type, detected_at, completed_at, recipients, delivered, p50_seconds, p95_seconds, max_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (alert['id'], alert['type'], alert['detected_at'], self.clock.time(), total_users, stats['delivered'], stats['p50'], stats['p95'], stats['max'])
+            )
+        alert['stats'] = stats
+        return stats
+    
+    def get_recent_alert_latency(self, limit=10):
+        """Get latency stats for the most recent alerts"""
         cursor = self.conn.cursor()
         cursor.execute(
-            'INSERT INTO stock_notifications (stock_level, notification_type) VALUES (?, ?)',
-            (stock_level, notification_type)
+            'SELECT alert_id, alert_type, detected_at, recipients, delivered, p50_seconds, p95_seconds, max_seconds FROM alert_latency ORDER BY detected_at DESC LIMIT ?',
+            (limit,)
         )
-        self.conn.commit()
+        return cursor.fetchall()
+    
+    def format_latency_stats(self, stats):
+        """Format alert latency stats for an admin message"""
+        if not stats or not stats['delivered']:
+            return "⏱️ Time to deliver: no deliveries"
+        return (f"⏱️ Time to deliver: p50 {stats['p50']:.1f}s • "
+                f"p95 {stats['p95']:.1f}s • max {stats['max']:.1f}s")
     
-    async def send_telegram_message(self, message, chat_id=None):
+    def telegram_request(self, method, payload, files=None):
+        """Call a Bot API method and return the decoded response (raises on HTTP errors)"""
+        with TELEGRAM_SEND_SECONDS.time(method=method):
+            if self.sender is not None:
+                return self.sender(method, payload, files)
+            url = telegram_api_url(self.config['telegram_bot_token'], method, self.config['telegram_api_base'])
+            response = requests.post(url, data=payload, files=files, timeout=10)
+        if response.status_code == 429:
+            TELEGRAM_429_TOTAL.inc()
+        response.raise_for_status()
+        return response.json()
+    
+    async def send_telegram_message(self, message, chat_id=None, reply_markup=None):
         """Send message via Telegram to specific chat_id"""
         try:
             if chat_id is None:
                 chat_id = self.config['telegram_chat_id']
             
-            url = f"https://api.telegram.org/bot{self.config['telegram_bot_token']}/sendMessage"
             payload = {
                 'chat_id': chat_id,
                 'text': message,
                 'parse_mode': 'HTML'
             }
+            if reply_markup:
+                payload['reply_markup'] = json.dumps(reply_markup)
             
-            response = requests.post(url, data=payload, timeout=10)
-            response.raise_for_status()
+            self.telegram_request('sendMessage', payload)
+            return True
+        except Exception as e:
+            FAILURES_TOTAL.inc(stage='send')
+            # Sampled: a broadcast to many blocked users fails here once per user
+            logger.error("❌ Error sending Telegram message to %s: %s", chat_id, e, extra={'sample': True})
+            # 403 means the user blocked the bot; keep them out of future broadcasts
+            if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 403:
+                self.deactivate_user(chat_id)
+            return False
+    
+    async def send_telegram_document(self, chat_id, filename, content, caption=''):
+        """Send a text file as a Telegram document"""
+        try:
+            payload = {
+                'chat_id': chat_id,
+                'caption': caption
+            }
+            files = {'document': (filename, content.encode('utf-8'), 'text/plain')}
+            self.telegram_request('sendDocument', payload, files)
             return True
         except Exception as e:
-            print(f"❌ Error sending Telegram message to {chat_id}: {e}")
+            FAILURES_TOTAL.inc(stage='send')
+            logger.error("❌ Error sending Telegram document to %s: %s", chat_id, e)
             return False
     
     async def send_telegram_message_with_keyboard(self, message, chat_id, is_admin=False):
@@ -381,7 +1775,8 @@ class SheinStockMonitor:
                     'keyboard': [
                         ['/start_monitor', '/stop_monitor'],
                         ['/check_now', '/status'],
-                        ['/admin', '/users']
+                        ['/admin', '/users'],
+                        ['/latency', '/profile']
                     ],
                     'resize_keyboard': True,
                     'one_time_keyboard': False
@@ -395,7 +1790,6 @@ class SheinStockMonitor:
                     'one_time_keyboard': False
                 }
             
-            url = f"https://api.telegram.org/bot{self.config['telegram_bot_token']}/sendMessage"
             payload = {
                 'chat_id': chat_id,
                 'text': message,
@@ -403,52 +1797,176 @@ class SheinStockMonitor:
                 'reply_markup': json.dumps(keyboard)
             }
             
-            response = requests.post(url, data=payload, timeout=10)
-            response.raise_for_status()
+            self.telegram_request('sendMessage', payload)
             return True
         except Exception as e:
-            print(f"❌ Error sending Telegram message with keyboard: {e}")
+            FAILURES_TOTAL.inc(stage='send')
+            logger.error("❌ Error sending Telegram message with keyboard: %s", e)
             return False
     
-    async def broadcast_message(self, message):
-        """Send message to ALL active users"""
-        users = self.get_all_active_users()
+    async def broadcast_message(self, message, alert=None):
+        """Send message to ALL active users, tracking delivery times for alerts"""
+        if self.shards:
+            return self.broadcast_sharded(message, alert)
+        delivered_at = array.array('d')  # 8 bytes per delivery, the only per-recipient state
         success_count = 0
-        total_users = len(users)
+        total_users = 0
         
-        print(f"📢 Broadcasting message to {total_users} users...")
+        logger.info("📢 Broadcasting message to %s users...", self.get_user_count())
         
-        for user in users:
-            user_id, username, first_name, chat_id = user
-            try:
-                success = await self.send_telegram_message(message, chat_id)
-                if success:
-                    success_count += 1
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                print(f"❌ Error broadcasting to user {user_id}: {e}")
+        with BROADCAST_SECONDS.time():
+            for chat_id in self.iter_active_chat_ids():
+                total_users += 1
+                try:
+                    session = self.profile_session
+                    if session is not None and session.begin('message'):
+                        try:
+                            success = await self.send_telegram_message(message, chat_id)
+                        finally:
+                            session.end()
+                    else:
+                        success = await self.send_telegram_message(message, chat_id)
+                    if success:
+                        success_count += 1
+                        if alert is not None:
+                            delivered_at.append(self.clock.time())
+                    await asyncio.sleep(self.config['broadcast_delay_seconds'])
+                except Exception as e:
+                    logger.error("❌ Error broadcasting to chat %s: %s", chat_id, e, extra={'sample': True})
+        
+        logger.info("✅ Broadcast completed: %s/%s users received the message", success_count, total_users)
+        if alert is not None:
+            self.record_alert_latency(alert, delivered_at, total_users)
+        return success_count, total_users
+    
+    def shard_for(self, chat_id):
+        """Stable shard for a chat, the same in every process and across restarts"""
+        return self.shards[zlib.crc32(str(chat_id).encode('utf-8')) % len(self.shards)]
+    
+    def broadcast_sharded(self, message, alert=None):
+        """Fan a broadcast out over the sender bots in parallel; chats whose sender bot
+        answers 403 go through the rate-limited primary bot"""
+        delivered_at = array.array('d')
+        results = {'success': 0}
+        results_lock = threading.Lock()
+        refusals = []
+        concurrency = self.config['shard_concurrency']
+        chunk_size = self.config['broadcast_chunk_size']
+        primary = self.primary_shard
+        senders = self.shards + [primary]
+        queues = {shard.index: queue.Queue(maxsize=chunk_size) for shard in senders}
+        
+        def deliver(shard, chat_id):
+            session = self.profile_session
+            if session is not None and session.begin('message'):
+                try:
+                    return shard.send_message(chat_id, message)
+                finally:
+                    session.end()
+            return shard.send_message(chat_id, message)
+        
+        def worker(shard, chat_queue):
+            while True:
+                chat_id = chat_queue.get()
+                if chat_id is None:
+                    return
+                try:
+                    status = deliver(shard, chat_id)
+                    if status == 403 and shard is not primary:
+                        with results_lock:
+                            refusals.append((str(chat_id), shard.bot_id))
+                            batch = refusals[:] if len(refusals) >= chunk_size else None
+                            if batch:
+                                refusals.clear()
+                        if batch:
+                            self.record_sender_refusals(batch)
+                        status = deliver(primary, chat_id)
+                    if status == 403:
+                        self.deactivate_user(chat_id)
+                    if status == 200:
+                        with results_lock:
+                            results['success'] += 1
+                            if alert is not None:
+                                delivered_at.append(self.clock.time())
+                except Exception as e:
+                    logger.error("❌ Error broadcasting to chat %s: %s", chat_id, e, extra={'sample': True})
+        
+        logger.info("📢 Broadcasting message to %s users over %s sender bots...", self.get_user_count(), len(self.shards))
+        for shard in senders:
+            with shard.stats_lock:
+                shard.stats = {'sent': 0, 'failed': 0, 'retried': 0}
         
-        print(f"✅ Broadcast completed: {success_count}/{total_users} users received the message")
+        started = time.perf_counter()
+        total_users = 0
+        with BROADCAST_SECONDS.time():
+            threads = []
+            for shard in senders:
+                for _ in range(concurrency):
+                    thread = threading.Thread(target=worker, args=(shard, queues[shard.index]), daemon=True)
+                    thread.start()
+                    threads.append(thread)
+            for chat_id, refused in self.iter_broadcast_roster():
+                total_users += 1
+                shard = self.shard_for(chat_id)
+                queues[primary.index if shard.bot_id in refused else shard.index].put(chat_id)
+            for shard in senders:
+                for _ in range(concurrency):
+                    queues[shard.index].put(None)
+            for thread in threads:
+                thread.join()
+            self.record_sender_refusals(refusals)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        
+        self.last_shard_report = "\n".join(
+            f"🔀 Bot {shard.label}: {shard.stats['sent']} sent • {shard.stats['failed']} failed • "
+            f"{shard.stats['retried']} retried • {shard.stats['sent'] / elapsed:.1f} msg/s"
+            for shard in senders
+        )
+        success_count = results['success']
+        logger.info("✅ Broadcast completed: %s/%s users received the message in %.1fs", success_count, total_users, elapsed)
+        if alert is not None:
+            self.record_alert_latency(alert, delivered_at, total_users)
         return success_count, total_users
     
+    def format_shard_report(self):
+        """Per-sender-bot lines from the last broadcast for admin reports ('' without shards)"""
+        return f"\n{self.last_shard_report}" if self.shards and self.last_shard_report else ''
+    
     def check_stock(self, manual_check=False, chat_id=None):
         """Check if stock has significantly increased"""
-        print("🔍 Checking Shein for stock updates...")
+        logger.debug("🔍 Checking Shein for stock updates...")
+        if not manual_check:
+            TICKS_TOTAL.inc()
         
-        current_stock, men_count, women_count = self.get_shein_stock_count()
+        # Manual checks only report; diffing products or facets here would move
+        # the baselines past changes the next tick should alert on
+        current_stock, men_count, women_count, products, facets = self.get_shein_stock_count(with_products=not manual_check)
+        detected_at = self.clock.time()
         if current_stock == 0 and men_count == 0:
             error_msg = "❌ Could not retrieve stock count"
-            print(error_msg)
+            logger.warning(error_msg, extra={'sample': True})
             if manual_check and chat_id:
                 asyncio.run(self.send_telegram_message(error_msg, chat_id))
             return
+        self.last_success_time = self.clock.time()
         
         previous_stock, prev_men_count, prev_women_count = self.get_previous_stock()
         men_change = men_count - prev_men_count
         women_change = women_count - prev_women_count
         
-        print(f"📊 Men's Stock: {men_count} (Previous: {prev_men_count}, Change: {men_change})")
-        print(f"👚 Women's Stock: {women_count} (Previous: {prev_women_count}, Change: {women_change})")
+        logger.debug("📊 Men's Stock: %s (Previous: %s, Change: %s)", men_count, prev_men_count, men_change)
+        logger.debug("👚 Women's Stock: %s (Previous: %s, Change: %s)", women_count, prev_women_count, women_change)
+        if not manual_check:
+            logger.info(
+                "📊 Men: %s (%+d) • Women: %s (%+d)", men_count, men_change, women_count, women_change,
+                extra={'sample': True, 'men_count': men_count, 'women_count': women_count}
+            )
+        
+        if manual_check and chat_id and self.live_status is not None:
+            # The live message renders the snapshot once it is saved
+            self.save_current_stock(current_stock, men_count, women_count, men_change)
+            self.live_status.show(chat_id)
+            return
         
         if manual_check and chat_id:
             status_message = f"""
@@ -471,39 +1989,75 @@ class SheinStockMonitor:
             self.save_current_stock(current_stock, men_count, women_count, men_change)
             return
         
+        product_events = self.diff_products(products)
+        facet_triggers = self.update_facets(facets)
+        
         # Check for significant men's stock increase (at least 2 items as requested)
         men_stock_increased = (
             men_change >= self.config['min_increase_threshold_men'] and 
-            men_count >= self.config['min_stock_threshold'] and
-            not self.has_stock_been_notified(men_count, "men_stock")
+            men_count >= self.config['min_stock_threshold']
         )
         
         # Check for significant women's stock increase
-        women_stock_increased = (
-            women_change >= self.config['min_increase_threshold_women'] and 
-            not self.has_stock_been_notified(women_count, "women_stock")
-        )
+        women_stock_increased = women_change >= self.config['min_increase_threshold_women']
         
-        if men_stock_increased:
-            print(f"🚨 Men's stock significantly increased: +{men_change}")
+        # Items listed under a count alert's "New items" heading
+        new_items = [e for e in product_events if e['kind'] in ('new', 'restock')]
+        items = []
+        notified = False
+        
+        # The claim is the dedupe check, so only make it for the alert we would send
+        if men_stock_increased and self.claim_notification(men_count, "men_stock"):
+            logger.info("🚨 Men's stock significantly increased: +%s", men_change)
+            ALERTS_TOTAL.inc(type='men_stock')
             self.save_current_stock(current_stock, men_count, women_count, men_change, True)
-            self.record_notification(men_count, "men_stock")
-            asyncio.run(self.send_men_stock_alert_to_all(men_count, prev_men_count, men_change))
+            notified = True
+            alert = self.new_alert('men_stock', detected_at)
+            items = [e for e in new_items if e['gender'] == 'Men']
+            asyncio.run(self.send_men_stock_alert_to_all(men_count, prev_men_count, men_change, alert, items))
         
-        elif women_stock_increased:
-            print(f"🚨 Women's stock significantly increased: +{women_change}")
+        elif women_stock_increased and self.claim_notification(women_count, "women_stock"):
+            logger.info("🚨 Women's stock significantly increased: +%s", women_change)
+            ALERTS_TOTAL.inc(type='women_stock')
             self.save_current_stock(current_stock, men_count, women_count, women_change, True)
-            self.record_notification(women_count, "women_stock")
-            asyncio.run(self.send_women_stock_alert_to_all(women_count, prev_women_count, women_change))
+            notified = True
+            alert = self.new_alert('women_stock', detected_at)
+            items = [e for e in new_items if e['gender'] == 'Women']
+            asyncio.run(self.send_women_stock_alert_to_all(women_count, prev_women_count, women_change, alert, items))
         
-        else:
+        # New items the totals missed (e.g. one sold out while another was added),
+        # or the other gender's items when a count alert already went out; the
+        # index has moved past them, so this tick is their only chance
+        remaining = [e for e in product_events if e not in items]
+        if self.should_alert_new_items(remaining):
+            logger.info("🚨 New items not covered by a count alert: %s", len(remaining))
+            ALERTS_TOTAL.inc(type='new_items')
+            if not notified:
+                self.save_current_stock(current_stock, men_count, women_count, men_change, True)
+                notified = True
+            alert = self.new_alert('new_items', detected_at)
+            asyncio.run(self.send_new_items_alert_to_all(remaining, alert))
+        
+        if not notified:
             # Save current stock without notification
             self.save_current_stock(current_stock, men_count, women_count, men_change, False)
             if not manual_check:
-                print("✅ No significant stock change detected or already notified")
+                logger.debug("✅ No significant stock change detected or already notified")
+        
+        if facet_triggers:
+            asyncio.run(self.send_facet_alerts(facet_triggers, detected_at))
+    
+    def should_alert_new_items(self, events):
+        """True if the product events include new or restocked items not yet alerted"""
+        keys = sorted(e['code'] for e in events if e['kind'] in ('new', 'restock'))
+        if not keys:
+            return False
+        # Claimed like the count alerts, keyed by a checksum of the item codes
+        return self.claim_notification(zlib.crc32(','.join(keys).encode('utf-8')), "new_items")
     
-    async def send_men_stock_alert_to_all(self, current_men_count, previous_men_count, increase):
+    async def send_men_stock_alert_to_all(self, current_men_count, previous_men_count, increase, alert=None, items=None):
         """Send MEN'S stock alert notifications to ALL users"""
+        items_block = f"\n\n🛍️ New items:\n{self.format_product_events(items)}" if items else ''
         message = f"""
 🚨 MEN'S SVerse STOCK ALERT! 🚨
 
@@ -511,30 +2065,33 @@ class SheinStockMonitor:
 
 📈 Change: +{increase} items
 📊 Current Men's: {current_men_count} items
-📉 Previous Men's: {previous_men_count} items
+📉 Previous Men's: {previous_men_count} items{items_block}
 
 🔗 Check Now: {self.config['api_url']}
 
-⏰ Alert Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+⏰ Alert Time: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ⚡ Quick! New Men's SVerse items available!
         """.strip()
         
-        success_count, total_users = await self.broadcast_message(message)
+        success_count, total_users = await self.broadcast_message(message, alert)
+        latency_line = self.format_latency_stats(alert['stats'] if alert else None) + self.format_shard_report()
         
         admin_report = f"""
 📊 MEN'S STOCK ALERT REPORT
 
 ✅ Alert sent successfully!
 👥 Recipients: {success_count}/{total_users} users
+{latency_line}
 📈 Men's Stock Increase: +{increase}
 🕒 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         """.strip()
         
         await self.send_telegram_message(admin_report, self.config['telegram_chat_id'])
     
-    async def send_women_stock_alert_to_all(self, current_women_count, previous_women_count, increase):
+    async def send_women_stock_alert_to_all(self, current_women_count, previous_women_count, increase, alert=None, items=None):
         """Send WOMEN'S stock alert notifications to ALL users"""
+        items_block = f"\n\n🛍️ New items:\n{self.format_product_events(items)}" if items else ''
         message = f"""
 🚨 WOMEN'S SVerse STOCK ALERT! 🚨
 
@@ -542,28 +2099,90 @@ class SheinStockMonitor:
 
 📈 Change: +{increase} items
 📊 Current Women's: {current_women_count} items
-📉 Previous Women's: {previous_women_count} items
+📉 Previous Women's: {previous_women_count} items{items_block}
 
 🔗 Check Now: {self.config['api_url']}
 
-⏰ Alert Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+⏰ Alert Time: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ⚡ Quick! New Women's SVerse items available!
         """.strip()
         
-        success_count, total_users = await self.broadcast_message(message)
+        success_count, total_users = await self.broadcast_message(message, alert)
+        latency_line = self.format_latency_stats(alert['stats'] if alert else None) + self.format_shard_report()
         
         admin_report = f"""
 📊 WOMEN'S STOCK ALERT REPORT
 
 ✅ Alert sent successfully!
 👥 Recipients: {success_count}/{total_users} users
+{latency_line}
 📈 Women's Stock Increase: +{increase}
 🕒 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         """.strip()
         
         await self.send_telegram_message(admin_report, self.config['telegram_chat_id'])
     
+    async def send_new_items_alert_to_all(self, events, alert=None):
+        """Send an alert naming new or restocked items to ALL users"""
+        new_count = sum(1 for e in events if e['kind'] == 'new')
+        restock_count = sum(1 for e in events if e['kind'] == 'restock')
+        message = f"""
+🚨 NEW SVerse ITEMS! 🚨
+
+🆕 New: {new_count} • 🔄 Restocked: {restock_count}
+
+{self.format_product_events(events)}
+
+🔗 Check Now: {self.config['api_url']}
+
+⏰ Alert Time: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}
+        """.strip()
+        
+        success_count, total_users = await self.broadcast_message(message, alert)
+        latency_line = self.format_latency_stats(alert['stats'] if alert else None) + self.format_shard_report()
+        
+        admin_report = f"""
+📊 NEW ITEMS ALERT REPORT
+
+✅ Alert sent successfully!
+👥 Recipients: {success_count}/{total_users} users
+{latency_line}
+🆕 New: {new_count} • 🔄 Restocked: {restock_count} • 📦 Events: {len(events)}
+🕒 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        """.strip()
+        
+        await self.send_telegram_message(admin_report, self.config['telegram_chat_id'])
+    
+    async def send_facet_alerts(self, triggered, detected_at):
+        """Send one alert per triggered facet watcher to that watcher's audience"""
+        for watcher, previous_count, current_count in triggered:
+            key = watcher['facet']
+            if not self.claim_notification(current_count, f"facet:{key}"):
+                continue
+            label = html.escape(watcher.get('label', key))
+            logger.info("🚨 Facet %s increased: %s -> %s", key, previous_count, current_count)
+            ALERTS_TOTAL.inc(type='facet')
+            message = f"""
+🚨 SVerse STOCK ALERT: {label} 🚨
+
+📈 Change: +{current_count - previous_count} items
+📊 Current: {current_count} items
+📉 Previous: {previous_count} items
+
+🔗 Check Now: {self.config['api_url']}
+
+⏰ Alert Time: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}
+            """.strip()
+            
+            audience = watcher.get('audience', 'all')
+            if audience == 'all':
+                await self.broadcast_message(message, self.new_alert(f"facet:{key}", detected_at))
+            else:
+                chat_ids = self.config['admin_user_ids'] if audience == 'admins' else audience
+                for chat_id in chat_ids:
+                    await self.send_telegram_message(message, chat_id)
+    
     async def send_test_notification(self, chat_id=None):
         """Send a test notification to verify everything works"""
         test_message = f"""
@@ -585,42 +2204,151 @@ class SheinStockMonitor:
         else:
             await self.broadcast_message(test_message)
         
-        print("✅ Test notification sent successfully!")
+        logger.info("✅ Test notification sent successfully!")
     
     def start_monitoring_loop(self):
         """Start monitoring in background thread"""
         def monitor():
-            print("🔄 Monitoring loop started!")
+            logger.info("🔄 Monitoring loop started!")
             while self.monitoring:
-                self.check_stock()
-                time.sleep(self.config['check_interval_seconds'])
-            print("🛑 Monitoring loop stopped")
+                session = self.profile_session
+                if session is None:
+                    self.check_stock()
+                else:
+                    self.run_profiled_tick(session)
+                if not self.boot_reported:
+                    self.report_first_check()
+                self.clock.sleep(self.config['check_interval_seconds'])
+            logger.info("🛑 Monitoring loop stopped")
         
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            # A loop stopped moments ago is still sleeping; it resumes on its own
+            return
         self.monitor_thread = threading.Thread(target=monitor)
         self.monitor_thread.daemon = True
         self.monitor_thread.start()
 
+    def report_first_check(self):
+        """Log boot-to-first-check time and only then send the startup notification"""
+        self.boot_reported = True
+        boot_seconds = time.monotonic() - BOOT_STARTED
+        BOOT_TO_FIRST_CHECK_SECONDS.set(boot_seconds)
+        logger.info("⏱️ Boot to first check: %.2fs", boot_seconds)
+        asyncio.run(self.send_test_notification(self.config['telegram_chat_id']))
+    
+    def run_profiled_tick(self, session):
+        """Run one check_stock under the active /profile session and report when it is done"""
+        if session.begin('tick'):
+            try:
+                self.check_stock()
+            finally:
+                session.end()
+        else:
+            self.check_stock()
+        
+        if session.done():
+            self.finish_profile(session)
+    
+    def start_profile(self, session):
+        """Make session the active /profile session and finish it at its deadline
+        even if no tick or broadcast gets to it first"""
+        self.profile_session = session
+        session.timer = threading.Timer(max(0.0, session.deadline - time.time()), self.finish_profile, (session,))
+        session.timer.daemon = True
+        session.timer.start()
+    
+    def finish_profile(self, session):
+        """Stop the session's profilers and send its report; only the first of the
+        tick loop, the deadline timer and stop_monitoring gets to do it"""
+        with self.profile_lock:
+            if self.profile_session is not session:
+                return
+            self.profile_session = None
+        if session.timer is not None:
+            session.timer.cancel()
+        session.close()
+        report = session.report()
+        logger.info("🔬 Profile finished: %s ticks, %s messages", session.ticks_profiled, session.messages_profiled)
+        asyncio.run(self.send_profile_report(report, session.chat_id))
+    
+    async def send_profile_report(self, report, chat_id):
+        """Send a profile report inline if it fits in a message, otherwise as a file"""
+        if len(report) < 3500:
+            await self.send_telegram_message(f"<pre>{html.escape(report)}</pre>", chat_id)
+        else:
+            filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+            await self.send_telegram_document(chat_id, filename, report, "🔬 Profile report")
+    
     def start_monitoring(self):
         """Start the monitoring"""
         if self.monitoring:
-            print("🔄 Monitoring is already running!")
+            logger.info("🔄 Monitoring is already running!")
             return
         
         self.monitoring = True
+        # Reload the product and facet baselines; another process may have advanced them while we were standby
+        self.product_index = None
+        self.facet_counts = None
+        self.products_text = None
+        # The loop runs the first check immediately; the startup notification
+        # goes to the admin chat only after that (see report_first_check)
         self.start_monitoring_loop()
-        asyncio.run(self.send_test_notification())
-        self.check_stock()
-        print("✅ Monitor started successfully! Running 24/7...")
+        logger.info("✅ Monitor started successfully! Running 24/7...")
     
     def stop_monitoring(self):
         """Stop monitoring"""
         if not self.monitoring:
-            print("❌ Monitoring is not running!")
+            logger.warning("❌ Monitoring is not running!")
             return
         
         self.monitoring = False
-        print("🛑 Monitoring stopped!")
+        logger.info("🛑 Monitoring stopped!")
+        session = self.profile_session
+        if session is not None:
+            # May be called from the command handler's event loop, so report from a thread
+            threading.Thread(target=self.finish_profile, args=(session,), daemon=True).start()
+
+    def render_status(self):
+        """Text of the /status message (also the live status message)"""
+        status = "🟢 RUNNING" if self.monitoring else "🔴 STOPPED"
+        user_count = self.get_user_count()
+        
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT total_stock, men_count, women_count, timestamp FROM stock_history ORDER BY id DESC LIMIT 1')
+        result = cursor.fetchone()
+        
+        if result:
+            total_stock, men_count, women_count, last_check = result
+            status_message = f"""
+🤖 SHEIN STOCK MONITOR STATUS
+
+📊 Monitor Status: {status}
+👥 Total Users: {user_count}
+⏰ Last Check: {last_check}
+🔄 Check Interval: 2 seconds
+
+📈 Latest Stock Data:
+   • Men's Items: {men_count}
+   • Women's Items: {women_count}
+   • Total Items: {total_stock}
+
+🔗 Monitoring: {self.config['api_url']}
+            """.strip()
+        else:
+            status_message = f"""
+🤖 SHEIN STOCK MONITOR STATUS
+
+📊 Monitor Status: {status}
+👥 Total Users: {user_count}
+⏰ Last Check: Never
+🔄 Check Interval: 2 seconds
+
+📈 No stock data collected yet.
 
+🔗 Monitoring: {self.config['api_url']}
+            """.strip()
+        return status_message
+    
     async def handle_telegram_command(self, command, chat_id, user_id):
         """Handle Telegram commands using direct API calls"""
         try:
@@ -651,6 +2379,8 @@ Available Commands:
 • /status - Current monitor status
 • /admin - Admin information
 • /users - User statistics
+• /latency - Alert delivery latency
+• /profile [ticks] [messages] - Profile the monitor (Admin only)
 
 👥 Total Users: {user_count}
 
@@ -683,6 +2413,7 @@ Use the buttons below to interact with the monitor!
                 else:
                     self.monitoring = True
                     self.start_monitoring_loop()
+                    self.set_state('monitoring_paused', False)
                     user_count = self.get_user_count()
                     await self.send_telegram_message_with_keyboard(
                         f"✅ Shein Stock Monitor STARTED! Bot is now actively monitoring SVerse stock for {user_count} users.", 
@@ -690,7 +2421,7 @@ Use the buttons below to interact with the monitor!
                         is_admin_user
                     )
                     await self.send_test_notification(chat_id)
-                    print("✅ Monitor started via admin command!")
+                    logger.info("✅ Monitor started via admin command!")
             
             elif command == '/stop_monitor':
                 if not is_admin_user:
@@ -700,55 +2431,24 @@ Use the buttons below to interact with the monitor!
                 if not self.monitoring:
                     await self.send_telegram_message("❌ Monitoring is not running!", chat_id)
                 else:
-                    self.monitoring = False
+                    self.stop_monitoring()
+                    # Kept in bot_state so a re-elected or restarted leader stays stopped
+                    self.set_state('monitoring_paused', True)
                     await self.send_telegram_message("🛑 Monitoring stopped!", chat_id)
-                    print("🛑 Monitoring stopped via admin command!")
+                    logger.info("🛑 Monitoring stopped via admin command!")
             
             elif command == '/check_now':
-                await self.send_telegram_message("🔍 Checking stock immediately...", chat_id)
-                print("🔍 Manual stock check requested")
-                self.check_stock(manual_check=True, chat_id=chat_id)
+                if self.live_status is None:
+                    await self.send_telegram_message("🔍 Checking stock immediately...", chat_id)
+                logger.info("🔍 Manual stock check requested")
+                # check_stock runs its own event loops for sending, so keep it off this one
+                await asyncio.to_thread(self.check_stock, True, chat_id)
             
             elif command == '/status':
-                status = "🟢 RUNNING" if self.monitoring else "🔴 STOPPED"
-                user_count = self.get_user_count()
-                
-                cursor = self.conn.cursor()
-                cursor.execute('SELECT total_stock, men_count, women_count, timestamp FROM stock_history ORDER BY timestamp DESC LIMIT 1')
-                result = cursor.fetchone()
-                
-                if result:
-                    total_stock, men_count, women_count, last_check = result
-                    status_message = f"""
-🤖 SHEIN STOCK MONITOR STATUS
-
-📊 Monitor Status: {status}
-👥 Total Users: {user_count}
-⏰ Last Check: {last_check}
-🔄 Check Interval: 2 seconds
-
-📈 Latest Stock Data:
-   • Men's Items: {men_count}
-   • Women's Items: {women_count}
-   • Total Items: {total_stock}
-
-🔗 Monitoring: {self.config['api_url']}
-                    """.strip()
+                if self.live_status is not None:
+                    self.live_status.show(chat_id)
                 else:
-                    status_message = f"""
-🤖 SHEIN STOCK MONITOR STATUS
-
-📊 Monitor Status: {status}
-👥 Total Users: {user_count}
-⏰ Last Check: Never
-🔄 Check Interval: 2 seconds
-
-📈 No stock data collected yet.
-
-🔗 Monitoring: {self.config['api_url']}
-                    """.strip()
-                
-                await self.send_telegram_message(status_message, chat_id)
+                    await self.send_telegram_message(self.render_status(), chat_id)
             
             elif command == '/admin':
                 if not is_admin_user:
@@ -775,150 +2475,233 @@ You have full control over the monitor.
                     await self.send_telegram_message("❌ Access Denied! Admin command only.", chat_id)
                     return
                 
-                users = self.get_all_active_users()
-                user_count = len(users)
+                users_message, keyboard = self.render_users_page()
+                await self.send_telegram_message(users_message, chat_id, keyboard)
+            
+            elif command == '/latency':
+                if not is_admin_user:
+                    await self.send_telegram_message("❌ Access Denied! Admin command only.", chat_id)
+                    return
                 
-                if user_count > 0:
-                    user_list = "\n".join([f"• {user[2]} (@{user[1]}) - {user[0]}" for user in users[:10]])
-                    if user_count > 10:
-                        user_list += f"\n• ... and {user_count - 10} more users"
-                    
-                    users_message = f"""
-👥 USER STATISTICS
-
-📊 Total Users: {user_count}
-
-👤 Recent Users:
-{user_list}
-
-⏰ Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-                    """.strip()
+                rows = self.get_recent_alert_latency(10)
+                if rows:
+                    lines = []
+                    for alert_id, alert_type, detected_at, recipients, delivered, p50, p95, max_seconds in rows:
+                        detected = datetime.fromtimestamp(detected_at).strftime('%m-%d %H:%M:%S')
+                        lines.append(
+                            f"• {detected} {alert_type} ({delivered}/{recipients})\n"
+                            f"   p50 {p50:.1f}s • p95 {p95:.1f}s • max {max_seconds:.1f}s"
+                        )
+                    latency_message = "⏱️ ALERT DELIVERY LATENCY\n\n" + "\n".join(lines)
                 else:
-                    users_message = "❌ No users found in the database."
+                    latency_message = "ℹ️ No alerts have been sent yet."
+                
+                await self.send_telegram_message(latency_message, chat_id)
+            
+            elif command == '/profile' or command.startswith('/profile '):
+                if not is_admin_user:
+                    await self.send_telegram_message("❌ Access Denied! Admin command only.", chat_id)
+                    return
+                
+                if self.profile_session is not None:
+                    await self.send_telegram_message("🔬 A profile is already running, please wait for its report.", chat_id)
+                    return
+                if not self.monitoring:
+                    await self.send_telegram_message("❌ Monitoring is not running! Start it before profiling.", chat_id)
+                    return
+                
+                args = command.split()[1:]
+                try:
+                    ticks = int(args[0]) if args else self.config['profile_default_ticks']
+                    messages = int(args[1]) if len(args) > 1 else self.config['profile_default_messages']
+                except ValueError:
+                    await self.send_telegram_message("❌ Usage: /profile [ticks] [messages]", chat_id)
+                    return
                 
-                await self.send_telegram_message(users_message, chat_id)
+                self.start_profile(ProfileSession(chat_id, max(1, ticks), max(0, messages), self.config['profile_max_seconds']))
+                await self.send_telegram_message(
+                    f"🔬 Profiling the next {max(1, ticks)} ticks and {max(0, messages)} broadcast messages "
+                    f"(up to {self.config['profile_max_seconds']}s). The report will follow.",
+                    chat_id
+                )
+                logger.info("🔬 Profile started by %s: %s ticks, %s messages", user_id, ticks, messages)
             
             else:
                 await self.send_telegram_message("❌ Unknown command. Use /start to see available commands.", chat_id)
                 
         except Exception as e:
-            print(f"❌ Error handling Telegram command: {e}")
+            logger.error("❌ Error handling Telegram command: %s", e)
             await self.send_telegram_message("❌ Error processing command. Please try again.", chat_id)
     
+    async def handle_callback_query(self, query):
+        """Handle inline keyboard presses (the /users pager)"""
+        message = query.get('message') or {}
+        chat_id = message.get('chat', {}).get('id')
+        data = query.get('data', '')
+        try:
+            if data.startswith('users:') and chat_id and self.is_admin(query['from']['id']):
+                _, direction, key = data.split(':', 2)
+                joined_date, row_id = key.rsplit('|', 1)
+                cursor = (joined_date, int(row_id))
+                users_message, keyboard = self.render_users_page(
+                    after=cursor if direction == 'after' else None,
+                    before=cursor if direction == 'before' else None
+                )
+                payload = {
+                    'chat_id': chat_id,
+                    'message_id': message['message_id'],
+                    'text': users_message,
+                    'parse_mode': 'HTML'
+                }
+                if keyboard:
+                    payload['reply_markup'] = json.dumps(keyboard)
+                self.telegram_request('editMessageText', payload)
+        except Exception as e:
+            logger.warning("⚠️ Error handling callback query %s: %s", data, e)
+        finally:
+            try:
+                # Stops the button's loading spinner
+                self.telegram_request('answerCallbackQuery', {'callback_query_id': query['id']})
+            except Exception as e:
+                logger.debug("ℹ️ Could not answer callback query: %s", e)
+    
     async def get_user_info(self, user_id):
         """Get user info from Telegram"""
         try:
-            url = f"https://api.telegram.org/bot{self.config['telegram_bot_token']}/getChat"
             payload = {
                 'chat_id': user_id
             }
-            response = requests.post(url, data=payload, timeout=10)
-            if response.status_code == 200:
-                return response.json().get('result', {})
+            return self.telegram_request('getChat', payload).get('result', {})
         except Exception as e:
-            print(f"⚠️ Error getting user info: {e}")
+            logger.warning("⚠️ Error getting user info: %s", e)
         return None
 
 def ensure_polling_mode(token):
     """Ensure the bot is in polling mode and prevent conflicts"""
-    print("🔄 Ensuring bot is in polling mode...")
+    logger.info("🔄 Ensuring bot is in polling mode...")
     
     # Method 1: Delete any existing webhook
     try:
-        url = f"https://api.telegram.org/bot{token}/deleteWebhook"
+        url = telegram_api_url(token, 'deleteWebhook')
         response = requests.get(url, timeout=10)
         if response.status_code == 200:
             result = response.json()
             if result.get('ok'):
-                print("✅ Webhook deleted successfully")
+                logger.info("✅ Webhook deleted successfully")
             else:
-                print(f"ℹ️ Webhook delete result: {result.get('description')}")
+                logger.info("ℹ️ Webhook delete result: %s", result.get('description'))
     except Exception as e:
-        print(f"⚠️ Error deleting webhook: {e}")
+        logger.warning("⚠️ Error deleting webhook: %s", e)
     
     # Method 2: Set empty webhook URL
     try:
-        url = f"https://api.telegram.org/bot{token}/setWebhook"
+        url = telegram_api_url(token, 'setWebhook')
         payload = {'url': ''}
         response = requests.post(url, data=payload, timeout=10)
         if response.status_code == 200:
             result = response.json()
             if result.get('ok'):
-                print("✅ Empty webhook set successfully")
+                logger.info("✅ Empty webhook set successfully")
             else:
-                print(f"ℹ️ Empty webhook result: {result.get('description')}")
+                logger.info("ℹ️ Empty webhook result: %s", result.get('description'))
     except Exception as e:
-        print(f"⚠️ Error setting empty webhook: {e}")
+        logger.warning("⚠️ Error setting empty webhook: %s", e)
     
     # Method 3: Get webhook info to confirm
     try:
-        url = f"https://api.telegram.org/bot{token}/getWebhookInfo"
+        url = telegram_api_url(token, 'getWebhookInfo')
         response = requests.get(url, timeout=10)
         if response.status_code == 200:
             result = response.json()
             if result.get('ok'):
                 webhook_info = result.get('result', {})
                 if not webhook_info.get('url'):
-                    print("✅ Confirmed: No active webhook (polling mode ready)")
+                    logger.info("✅ Confirmed: No active webhook (polling mode ready)")
                 else:
-                    print(f"⚠️ Webhook still active: {webhook_info.get('url')}")
+                    logger.warning("⚠️ Webhook still active: %s", webhook_info.get('url'))
     except Exception as e:
-        print(f"⚠️ Error getting webhook info: {e}")
+        logger.warning("⚠️ Error getting webhook info: %s", e)
     
-    print("✅ Bot is ready for polling mode")
+    logger.info("✅ Bot is ready for polling mode")
 
 def check_bot_health(token):
-    """Check if bot is healthy and ready"""
+    """Check if bot is healthy and ready; returns the getMe result or None"""
     try:
-        url = f"https://api.telegram.org/bot{token}/getMe"
+        url = telegram_api_url(token, 'getMe')
         response = requests.get(url, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if data.get('ok'):
                 bot_info = data.get('result', {})
-                print(f"✅ Bot is healthy: @{bot_info.get('username', 'Unknown')}")
-                return True
-        print(f"❌ Bot health check failed: {response.status_code}")
-        return False
+                logger.info("✅ Bot is healthy: @%s", bot_info.get('username', 'Unknown'))
+                return bot_info
+        logger.error("❌ Bot health check failed: %s", response.status_code)
+        return None
     except Exception as e:
-        print(f"❌ Bot health check error: {e}")
-        return False
+        logger.error("❌ Bot health check error: %s", e)
+        return None
+
+def bootstrap_telegram_bot(monitor, token):
+    """Health check and polling-mode setup, skipped while the cached results are fresh"""
+    max_age = CONFIG['bootstrap_cache_seconds']
+    bot_id = token.split(':')[0]
+    
+    identity = monitor.get_state('bot_identity', max_age)
+    if identity and str(identity.get('id')) == bot_id:
+        logger.info("✅ Using cached bot identity: @%s", identity.get('username', 'Unknown'))
+    else:
+        identity = check_bot_health(token)
+        if not identity:
+            return False
+        monitor.set_state('bot_identity', identity)
+    
+    if monitor.get_state('polling_mode', max_age) == bot_id:
+        logger.info("✅ Using cached webhook status (polling mode)")
+    else:
+        ensure_polling_mode(token)
+        monitor.set_state('polling_mode', bot_id)
+    return True
 
 def start_conflict_free_telegram_bot(monitor):
     """Start a conflict-free Telegram bot using proper polling"""
     def poll_telegram_updates():
-        print("🤖 Starting conflict-free Telegram bot polling...")
+        logger.info("🤖 Starting conflict-free Telegram bot polling...")
         
-        # Step 1: Health check
-        if not check_bot_health(CONFIG['telegram_bot_token']):
-            print("❌ Bot health check failed, cannot start Telegram bot")
+        # Health check and polling mode (cached across restarts)
+        if not bootstrap_telegram_bot(monitor, CONFIG['telegram_bot_token']):
+            logger.error("❌ Bot health check failed, cannot start Telegram bot")
             return
         
-        # Step 2: Ensure polling mode
-        ensure_polling_mode(CONFIG['telegram_bot_token'])
-        
-        last_update_id = 0
+        # Resume after the last update handled before the restart
+        last_update_id = monitor.get_state('telegram_offset') or 0
         error_count = 0
         max_errors = 10
         
-        while True:
+        while monitor.telegram_running:
             try:
                 # Get updates from Telegram with NO timeout (short polling)
-                url = f"https://api.telegram.org/bot{CONFIG['telegram_bot_token']}/getUpdates"
+                url = telegram_api_url(CONFIG['telegram_bot_token'], 'getUpdates')
                 params = {
                     'offset': last_update_id + 1,
                     'timeout': 0,  # No long polling - prevents conflicts
-                    'allowed_updates': ['message']
+                    'allowed_updates': json.dumps(['message', 'callback_query'])
                 }
                 
-                response = requests.get(url, params=params, timeout=10)
+                with TELEGRAM_SEND_SECONDS.time(method='getUpdates'):
+                    response = requests.get(url, params=params, timeout=10)
+                if response.status_code == 429:
+                    TELEGRAM_429_TOTAL.inc()
                 
                 # If we get a conflict, it means someone else is using webhooks
                 if response.status_code == 409:
-                    print("❌ CONFLICT DETECTED: Another service is using webhooks with this bot token!")
-                    print("💡 Solution: Stop any other services using this bot token")
-                    print("🔄 This bot will continue monitoring but Telegram commands may not work")
-                    time.sleep(30)  # Wait before retrying
+                    logger.error("❌ CONFLICT DETECTED: Another service is using webhooks with this bot token!")
+                    logger.info("💡 Solution: Stop any other services using this bot token")
+                    logger.info("🔄 This bot will continue monitoring but Telegram commands may not work")
+                    # The cached webhook status is stale, so redo the webhook cleanup now
+                    ensure_polling_mode(CONFIG['telegram_bot_token'])
+                    monitor.set_state('polling_mode', CONFIG['telegram_bot_token'].split(':')[0])
+                    # During a takeover the old leader may still be polling; it stops within one lease
+                    time.sleep(CONFIG['leader_lease_seconds'])
                     continue
                 
                 response.raise_for_status()
@@ -935,18 +2718,23 @@ def start_conflict_free_telegram_bot(monitor):
                             user_id = message['from']['id']
                             text = message['text']
                             
-                            print(f"📱 Received command: {text} from user {user_id}")
+                            logger.info("📱 Received command: %s from user %s", text, user_id)
                             asyncio.run(monitor.handle_telegram_command(text, chat_id, user_id))
+                        
+                        elif 'callback_query' in update:
+                            asyncio.run(monitor.handle_callback_query(update['callback_query']))
+                    monitor.set_state('telegram_offset', last_update_id)
                 else:
                     # No new updates, sleep briefly to avoid rate limits
                     time.sleep(0.5)
                 
             except requests.RequestException as e:
                 error_count += 1
-                print(f"⚠️ Telegram polling error ({error_count}/{max_errors}): {e}")
+                FAILURES_TOTAL.inc(stage='poll')
+                logger.warning("⚠️ Telegram polling error (%s/%s): %s", error_count, max_errors, e)
                 
                 if error_count >= max_errors:
-                    print("🔧 Too many errors, waiting before continuing...")
+                    logger.info("🔧 Too many errors, waiting before continuing...")
                     time.sleep(30)
                     error_count = 0
                 else:
@@ -954,46 +2742,75 @@ def start_conflict_free_telegram_bot(monitor):
                 
             except Exception as e:
                 error_count += 1
-                print(f"❌ Unexpected Telegram bot error ({error_count}/{max_errors}): {e}")
+                logger.error("❌ Unexpected Telegram bot error (%s/%s): %s", error_count, max_errors, e)
                 
                 if error_count >= max_errors:
-                    print("🔧 Too many errors, waiting before continuing...")
+                    logger.info("🔧 Too many errors, waiting before continuing...")
                     time.sleep(30)
                     error_count = 0
                 else:
                     time.sleep(2)
+        
+        logger.info("🛑 Telegram polling stopped")
     
-    bot_thread = threading.Thread(target=poll_telegram_updates)
-    bot_thread.daemon = True
-    bot_thread.start()
-    print("✅ Conflict-free Telegram bot started successfully!")
+    monitor.telegram_running = True
+    if monitor.telegram_thread and monitor.telegram_thread.is_alive():
+        # Polling was stopped but the thread has not noticed yet; let it carry on
+        return True
+    monitor.telegram_thread = threading.Thread(target=poll_telegram_updates)
+    monitor.telegram_thread.daemon = True
+    monitor.telegram_thread.start()
+    logger.info("✅ Conflict-free Telegram bot started successfully!")
     return True
 
+def stop_telegram_bot(monitor):
+    """Stop polling after the current batch (a standby must not call getUpdates)"""
+    monitor.telegram_running = False
+
 def main():
     """Main function"""
-    print("🚀 Starting Shein Stock Monitor Cloud Bot...")
-    print("💡 This bot runs 24/7 in the cloud!")
-    print("📱 Sends Telegram alerts when stock increases")
+    setup_logging(CONFIG)
+    logger.info("🚀 Starting Shein Stock Monitor Cloud Bot...")
+    logger.info("💡 This bot runs 24/7 in the cloud!")
+    logger.info("📱 Sends Telegram alerts when stock increases")
     admin_count = len(CONFIG['admin_user_ids'])
-    print(f"👑 Admin users: {admin_count}")
+    logger.info("👑 Admin users: %s", admin_count)
     
     monitor = SheinStockMonitor(CONFIG)
     
-    # Start conflict-free Telegram bot
-    telegram_started = start_conflict_free_telegram_bot(monitor)
+    def on_elected():
+        # Start monitoring first so the first check is not queued behind Telegram setup
+        if monitor.get_state('monitoring_paused'):
+            logger.info("⏸️ Monitoring was stopped with /stop_monitor; use /start_monitor to resume")
+        else:
+            logger.info("🤖 Starting automatic monitoring...")
+            monitor.start_monitoring()
+        start_conflict_free_telegram_bot(monitor)
+        logger.info("✅ Monitor is running with Telegram commands!")
+        logger.info("💡 Use /start in Telegram to control the monitor.")
     
-    # Start monitoring immediately
-    print("🤖 Starting automatic monitoring...")
-    monitor.start_monitoring()
+    def on_demoted():
+        monitor.stop_monitoring()
+        stop_telegram_bot(monitor)
     
-    if telegram_started:
-        print("✅ Monitor is running with Telegram commands!")
-        print("💡 Use /start in Telegram to control the monitor.")
+    if CONFIG['metrics_enabled']:
+        start_metrics_server(CONFIG['metrics_host'], CONFIG['metrics_port'])
+    
+    elector = None
+    if CONFIG['leader_election_enabled'] and CONFIG['database_path'] != ':memory:':
+        # Only the lease holder scrapes and polls; other copies wait as hot standbys
+        elector = LeaderElector(
+            CONFIG['database_path'], on_elected, on_demoted,
+            CONFIG['leader_lease_seconds'], CONFIG['leader_renew_seconds']
+        ).start()
     else:
-        print("✅ Monitor is running in monitoring-only mode!")
-        print("💡 Stock alerts will still be sent to Telegram.")
+        IS_LEADER.set(1)
+        on_elected()
+    
+    logger.info("🤖 Bot is running 24/7...")
     
-    print("🤖 Bot is running 24/7...")
+    # Deploys stop us with SIGTERM; treat it like Ctrl+C so the lease is released
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     
     try:
         # Keep the main thread alive
@@ -1001,8 +2818,12 @@ def main():
             time.sleep(60)
             
     except KeyboardInterrupt:
-        print("\n🛑 Stopping monitor...")
-        monitor.stop_monitoring()
+        logger.info("🛑 Stopping monitor...")
+        if elector:
+            elector.release()
+        if monitor.monitoring:
+            monitor.stop_monitoring()
+        stop_telegram_bot(monitor)
 
 if __name__ == "__main__":
     main()
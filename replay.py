@@ -0,0 +1,260 @@
+"""Replay recorded or synthetic stock curves through check_stock.
+
+The monitor runs fully offline: a virtual clock jumps from snapshot to
+snapshot, the fetcher hands back the recorded page (or a tiny page
+carrying just the facet counts) and Telegram calls go to an in-memory
+sender. That makes a day of 2-second ticks replay in seconds, so the
+thresholds and the dedupe window can be tuned against alert count,
+false positives and detection delay.
+
+Snapshot files are JSON lines:
+
+    {"t": 1760000000.0, "men": 41, "women": 388}
+    {"t": 1760000002.0, "page": "pages/1760000002.html.gz"}
+    {"t": 1760000002.0, "event": "men_stock"}      <- optional ground truth
+
+    python replay.py --synthetic --hours 24
+    python replay.py snapshots.jsonl --men-threshold 3 --dedupe 600
+    python replay.py --synthetic --sweep-men 1,2,3,5 --sweep-women 25,50 --sweep-dedupe 600,3600
+    python replay.py --record snapshots.jsonl --hours 24 --pages-dir pages
+"""
+import argparse
+import bisect
+import gzip
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+import bot_controller
+
+COUNT_PAGE = ('<html><body><pre>"genderfilter-Men":{"name":"Men","count":%d},'
+              '"genderfilter-Women":{"name":"Women","count":%d}</pre></body></html>')
+
+
+class VirtualClock(bot_controller.SystemClock):
+    """Clock that only moves when the replay (or a sleep) advances it"""
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def time(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += seconds
+
+
+class ReplaySender:
+    """Stands in for the Bot API; counts calls instead of sending"""
+    def __init__(self):
+        self.calls = {}
+
+    def __call__(self, method, payload, files=None):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        return {'ok': True, 'result': {'message_id': sum(self.calls.values()), 'chat': {'id': payload.get('chat_id')}}}
+
+
+def load_snapshots(path):
+    """Read a snapshot file into (ticks, events)"""
+    base = os.path.dirname(os.path.abspath(path))
+    ticks, events = [], []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if 'event' in row:
+                events.append((row['t'], row['event']))
+            elif 'page' in row:
+                page_path = os.path.join(base, row['page'])
+                opener = gzip.open if page_path.endswith('.gz') else open
+                with opener(page_path, 'rt', encoding='utf-8') as page:
+                    ticks.append((row['t'], page.read()))
+            else:
+                ticks.append((row['t'], COUNT_PAGE % (row['men'], row['women'])))
+    return ticks, events
+
+
+def synthetic_snapshots(hours, interval, seed=1, restocks_per_day=8, start=1760000000.0):
+    """Stock curve with sell-through, one-tick glitches and labelled restocks"""
+    rng = random.Random(seed)
+    total_ticks = int(hours * 3600 / interval)
+    restock_count = max(1, int(restocks_per_day * hours / 24))
+    restock_ticks = {rng.randrange(60, total_ticks): rng.choice(['men_stock', 'women_stock'])
+                     for _ in range(restock_count)}
+    men, women = 40, 400
+    trickle = {'men_stock': 0, 'women_stock': 0}
+    ticks, events = [], []
+
+    for i in range(total_ticks):
+        t = start + i * interval
+        if rng.random() < 0.02:
+            men = max(5, men - rng.randint(1, 2))
+        if rng.random() < 0.05:
+            women = max(50, women - rng.randint(1, 5))
+
+        kind = restock_ticks.get(i)
+        if kind:
+            events.append((t, kind))
+            if rng.random() < 0.5:
+                # Burst: the whole drop lands in one tick
+                if kind == 'men_stock':
+                    men += rng.randint(3, 15)
+                else:
+                    women += rng.randint(60, 200)
+            else:
+                # Trickle: items are added a few per tick
+                trickle[kind] = rng.randint(4, 12)
+        if trickle['men_stock']:
+            men += 1
+            trickle['men_stock'] -= 1
+        if trickle['women_stock']:
+            women += rng.randint(5, 15)
+            trickle['women_stock'] -= 1
+
+        # Glitches: a stale cache briefly reports extra items, then reverts
+        glitch_men = rng.randint(1, 4) if rng.random() < 0.002 else 0
+        glitch_women = rng.randint(20, 80) if rng.random() < 0.001 else 0
+        ticks.append((t, COUNT_PAGE % (men + glitch_men, women + glitch_women)))
+
+    return ticks, events
+
+
+def run_replay(ticks, events, overrides=None, match_window=600):
+    """Drive check_stock over the ticks and score the alerts it raised"""
+    clock = VirtualClock(ticks[0][0] if ticks else 0.0)
+    current = {'page': ''}
+    sender = ReplaySender()
+    config = dict(bot_controller.CONFIG, database_path=':memory:', broadcast_delay_seconds=0)
+    config.update(overrides or {})
+
+    monitor = bot_controller.SheinStockMonitor(config, fetcher=lambda: current['page'], sender=sender, clock=clock)
+    monitor.add_user('replay', 'replay', 'Replay', '', 'replay')
+    started = time.perf_counter()
+    for t, page in ticks:
+        clock.current = t
+        current['page'] = page
+        monitor.check_stock()
+    elapsed = time.perf_counter() - started
+
+    cursor = monitor.conn.cursor()
+    cursor.execute('SELECT alert_type, detected_at FROM alert_latency ORDER BY detected_at')
+    alerts = cursor.fetchall()
+
+    # Credit each alert to the latest unmatched true event of the same type before it
+    pending = {}
+    for t, kind in sorted(events):
+        pending.setdefault(kind, []).append(t)
+    delays, false_positives = [], 0
+    for kind, detected_at in alerts:
+        candidates = pending.get(kind, [])
+        index = bisect.bisect_right(candidates, detected_at) - 1
+        if index >= 0 and detected_at - candidates[index] <= match_window:
+            delays.append(detected_at - candidates.pop(index))
+        else:
+            false_positives += 1
+
+    delays.sort()
+    return {
+        'ticks': len(ticks),
+        'ticks_per_second': round(len(ticks) / elapsed) if elapsed else 0,
+        'alerts': len(alerts),
+        'true_events': len(events),
+        'detected': len(delays),
+        'false_positives': false_positives if events else None,
+        'missed': sum(len(v) for v in pending.values()) if events else None,
+        'delay_p50': bot_controller.percentile(delays, 50) if delays else None,
+        'delay_max': delays[-1] if delays else None,
+        'telegram_calls': sum(sender.calls.values()),
+    }
+
+
+def record(path, hours, interval, pages_dir=None):
+    """Poll the live page and append snapshots to path"""
+    monitor = bot_controller.SheinStockMonitor(bot_controller.CONFIG)
+    deadline = time.time() + hours * 3600
+    if pages_dir:
+        os.makedirs(pages_dir, exist_ok=True)
+    with open(path, 'a') as out:
+        while time.time() < deadline:
+            t = time.time()
+            try:
+                page = monitor.fetch_shein_page()
+                total, men, women, _, _ = monitor.parse_stock_page(page, with_products=False)
+                row = {'t': t, 'men': men, 'women': women}
+                if pages_dir:
+                    name = os.path.join(pages_dir, f'{int(t)}.html.gz')
+                    with gzip.open(name, 'wt', encoding='utf-8') as f:
+                        f.write(page)
+                    row = {'t': t, 'page': os.path.relpath(name, os.path.dirname(os.path.abspath(path)))}
+                out.write(json.dumps(row) + '\n')
+                out.flush()
+            except Exception as e:
+                print(f"⚠️ Error recording snapshot: {e}")
+            time.sleep(max(0.0, interval - (time.time() - t)))
+
+
+def format_delay(value):
+    return '-' if value is None else f'{value:.0f}s'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('snapshots', nargs='?', help='JSON lines snapshot file')
+    parser.add_argument('--synthetic', action='store_true', help='generate a synthetic stock curve')
+    parser.add_argument('--record', metavar='FILE', help='record live snapshots into FILE instead of replaying')
+    parser.add_argument('--pages-dir', help='with --record, also keep every page (gzipped) here')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--interval', type=float, default=bot_controller.CONFIG['check_interval_seconds'])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--men-threshold', type=int, default=bot_controller.CONFIG['min_increase_threshold_men'])
+    parser.add_argument('--women-threshold', type=int, default=bot_controller.CONFIG['min_increase_threshold_women'])
+    parser.add_argument('--dedupe', type=int, default=bot_controller.CONFIG['notification_dedupe_seconds'],
+                        help='notification dedupe window in seconds')
+    parser.add_argument('--sweep-men', help='comma separated men thresholds to try')
+    parser.add_argument('--sweep-women', help='comma separated women thresholds to try')
+    parser.add_argument('--sweep-dedupe', help='comma separated dedupe windows to try')
+    parser.add_argument('--match-window', type=float, default=600,
+                        help='max seconds between a true event and the alert that detects it')
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.hours, args.interval, args.pages_dir)
+        return
+    if args.synthetic:
+        ticks, events = synthetic_snapshots(args.hours, args.interval, args.seed)
+    elif args.snapshots:
+        ticks, events = load_snapshots(args.snapshots)
+    else:
+        parser.error('pass a snapshot file or --synthetic')
+    if not ticks:
+        parser.error('no snapshots to replay')
+
+    def values(sweep, default):
+        return [int(v) for v in sweep.split(',')] if sweep else [default]
+
+    grid = itertools.product(values(args.sweep_men, args.men_threshold),
+                             values(args.sweep_women, args.women_threshold),
+                             values(args.sweep_dedupe, args.dedupe))
+
+    print(f"{len(ticks)} ticks, {len(events)} labelled restocks")
+    print(f"{'men':>4} {'women':>6} {'dedupe':>7} {'alerts':>7} {'hits':>5} {'false+':>7} "
+          f"{'missed':>7} {'delay p50':>10} {'delay max':>10} {'ticks/s':>8}")
+    for men_threshold, women_threshold, dedupe in grid:
+        result = run_replay(ticks, events, {
+            'min_increase_threshold_men': men_threshold,
+            'min_increase_threshold_women': women_threshold,
+            'notification_dedupe_seconds': dedupe,
+        }, args.match_window)
+        false_positives = '-' if result['false_positives'] is None else result['false_positives']
+        missed = '-' if result['missed'] is None else result['missed']
+        print(f"{men_threshold:>4} {women_threshold:>6} {dedupe:>7} {result['alerts']:>7} {result['detected']:>5} "
+              f"{false_positives:>7} {missed:>7} {format_delay(result['delay_p50']):>10} "
+              f"{format_delay(result['delay_max']):>10} {result['ticks_per_second']:>8}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())